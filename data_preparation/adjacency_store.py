@@ -0,0 +1,140 @@
+# Compact on-disk format for ASGCN dependency adjacency matrices
+#
+# A .graph/.tree pickle stores one dense float32 n x n matrix per example. Almost every entry is 0,
+# so instead we keep the (row, col) positions of the 1s for all examples in one uncompressed .npz:
+#
+#   keys     int64  example key (the line index used by the pickles)
+#   sizes    int32  n for each example
+#   offsets  int64  example i's edges are rows/cols[offsets[i]:offsets[i + 1]]
+#   rows     int16  row of each non-zero entry
+#   cols     int16  column of each non-zero entry
+#
+# The members are stored uncompressed, so they can be memory-mapped straight out of the file and
+# a dense matrix is only built for the example that is asked for.
+# Import necessary libraries
+import pickle
+import zipfile
+import numpy as np
+
+MEMBERS = ['keys', 'sizes', 'offsets', 'rows', 'cols']
+
+
+def save_adjacency(idx2matrix, filename):
+    """
+    Writes a {key: dense matrix} dict in the compact format.
+    """
+    keys = sorted(idx2matrix)
+    sizes = np.zeros(len(keys), dtype=np.int32)
+    offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+    all_rows = []
+    all_cols = []
+    for i, key in enumerate(keys):
+        matrix = idx2matrix[key]
+        rows, cols = np.nonzero(matrix)
+        if not np.all(matrix[rows, cols] == 1):
+            raise ValueError(f"Matrix {key} is not a 0/1 adjacency matrix and cannot be stored as an edge list.")
+        sizes[i] = matrix.shape[0]
+        offsets[i + 1] = offsets[i] + len(rows)
+        all_rows.append(rows)
+        all_cols.append(cols)
+
+    index_dtype = np.int16 if sizes.size == 0 or sizes.max() <= np.iinfo(np.int16).max else np.int32
+    rows = np.concatenate(all_rows).astype(index_dtype) if all_rows else np.zeros(0, dtype=index_dtype)
+    cols = np.concatenate(all_cols).astype(index_dtype) if all_cols else np.zeros(0, dtype=index_dtype)
+    np.savez(filename, keys=np.array(keys, dtype=np.int64), sizes=sizes, offsets=offsets, rows=rows, cols=cols)
+
+
+def _memmap_npz(filename):
+    """
+    Memory-maps every member of an uncompressed .npz file.
+    """
+    arrays = {}
+    with zipfile.ZipFile(filename) as archive, open(filename, 'rb') as f:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"'{filename}' is compressed and cannot be memory-mapped.")
+            # Skip the zip local file header to reach the .npy data
+            f.seek(info.header_offset)
+            header = f.read(30)
+            name_length = int.from_bytes(header[26:28], 'little')
+            extra_length = int.from_bytes(header[28:30], 'little')
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            name = info.filename[:-len('.npy')]
+            if shape[0] == 0:
+                arrays[name] = np.zeros(shape, dtype=dtype)
+            else:
+                arrays[name] = np.memmap(filename, dtype=dtype, mode='r', offset=f.tell(), shape=shape,
+                                         order='F' if fortran_order else 'C')
+    return arrays
+
+
+class AdjacencyStore(object):
+    """
+    Read-only, dict-like view of a compact adjacency file.
+
+    store[key] rebuilds the dense float32 matrix for that one example, so it can be used
+    anywhere the unpickled {key: matrix} dict was used.
+    """
+    def __init__(self, filename, mmap=True):
+        if mmap:
+            arrays = _memmap_npz(filename)
+        else:
+            with np.load(filename) as data:
+                arrays = {name: data[name] for name in MEMBERS}
+        self._keys = arrays['keys']
+        self._sizes = arrays['sizes']
+        self._offsets = arrays['offsets']
+        self._rows = arrays['rows']
+        self._cols = arrays['cols']
+        # Small lookup table from example key to position in the arrays
+        self._positions = {int(key): i for i, key in enumerate(self._keys)}
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, key):
+        return key in self._positions
+
+    def __iter__(self):
+        return iter(self._positions)
+
+    def keys(self):
+        return self._positions.keys()
+
+    def size(self, key):
+        return int(self._sizes[self._positions[key]])
+
+    def edges(self, key):
+        """
+        Returns the (rows, cols) arrays of the non-zero entries for one example.
+        """
+        i = self._positions[key]
+        start, end = self._offsets[i], self._offsets[i + 1]
+        return self._rows[start:end], self._cols[start:end]
+
+    def __getitem__(self, key):
+        n = self.size(key)
+        rows, cols = self.edges(key)
+        matrix = np.zeros((n, n), dtype='float32')
+        matrix[rows, cols] = 1
+        return matrix
+
+    def items(self):
+        for key in self._positions:
+            yield key, self[key]
+
+
+def load_adjacency(filename):
+    """
+    Opens either format: compact .npz files lazily, ASGCN pickles by unpickling the whole dict.
+    """
+    if filename.endswith('.npz'):
+        return AdjacencyStore(filename)
+    with open(filename, 'rb') as f:
+        return pickle.load(f)
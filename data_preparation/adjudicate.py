@@ -0,0 +1,545 @@
+# Adjudication engine: agreements, disagreements and inter-annotator agreement for any number of annotators
+# Replaces running find_disagreements.py and calculate_iaa.py separately: every annotator file is read once,
+# rows are joined on a hash of (sentence, aspect_term) rather than on row order or full strings, and
+# pairwise Cohen's kappa plus Fleiss' kappa are computed in the same pass.
+# Import necessary libraries
+import glob
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import sys
+import numpy as np
+import pandas as pd
+from instrumentation import StageProfiler
+from file_hashes import prefix_fingerprint, prefix_unchanged
+
+# --- Configuration ---
+ANNOTATOR_FILES = sorted(glob.glob('annotator_*.csv')) # annotator_1.csv, annotator_2.csv, ...
+AGREEMENTS_FILE = 'agreements.csv'
+DISAGREEMENTS_FILE = 'disagreements_to_fix.csv'
+
+# Columns to check
+SENTENCE_COL = 'sentence'
+ASPECT_COL = 'aspect_term'
+LABEL_COL = 'polarity'
+FINAL_COL = 'final_polarity' # Filled in by hand in the disagreements file; never overwritten
+
+# Incremental mode only reads the rows appended to the annotator files since the last run,
+# updates the kappa statistics from saved running totals, and appends new agreements and
+# conflicts to the output files instead of rewriting them. Only the first and last 64 KB of
+# the part read last time are checked, so re-saved or rewritten annotator files are noticed
+# (the outputs and the state are then rebuilt from scratch), but a same-length relabel deep
+# inside a large file is not: delete STATE_FILE after editing old rows by hand.
+INCREMENTAL = False
+STATE_FILE = 'adjudication_state.sqlite' # Running totals and row keys for incremental mode (delete it to rebuild)
+# ---------------------
+
+def row_key(sentence, aspect):
+    """
+    Compact 64-bit key for a (sentence, aspect_term) pair.
+    """
+    digest = hashlib.blake2b((sentence + '\x1f' + aspect).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little', signed=True)
+
+
+def annotator_name(filename):
+    # annotator_1.csv -> annotator_1
+    return os.path.splitext(os.path.basename(filename))[0]
+
+
+def load_annotations(files):
+    """
+    Reads each annotator file once and joins them on the row key.
+    Returns (texts, labels): texts has the sentence/aspect of every key, labels has one column of
+    original label strings per annotator (NaN where an annotator did not label that row).
+    """
+    texts = []
+    labels = []
+    for filename in files:
+        df = pd.read_csv(filename, usecols=[SENTENCE_COL, ASPECT_COL, LABEL_COL], dtype=str)
+        df = df.dropna(subset=[LABEL_COL])
+        df.index = [row_key(s, a) for s, a in zip(df[SENTENCE_COL].astype(str), df[ASPECT_COL].astype(str))]
+        # An annotator who labelled the same row twice counts once (their first label)
+        df = df[~df.index.duplicated(keep='first')]
+        texts.append(df[[SENTENCE_COL, ASPECT_COL]])
+        labels.append(df[LABEL_COL].rename(annotator_name(filename) + '_label'))
+
+    texts = pd.concat(texts)
+    texts = texts[~texts.index.duplicated(keep='first')]
+    # Aligning the Series on their integer index is a hash join over all annotators at once
+    labels = pd.concat(labels, axis=1, sort=False)
+    return texts, labels
+
+
+def encode_labels(labels):
+    """
+    Turns the label strings into integer codes (-1 for missing), comparing them case-insensitively.
+    """
+    normalized = labels.apply(lambda column: column.str.strip().str.lower())
+    # Rows an annotator has not labelled are NaN (pandas 3's stack() keeps them)
+    categories = sorted(set(normalized.stack().dropna()))
+    codes = np.full(labels.shape, -1, dtype=np.int16)
+    for j, column in enumerate(normalized.columns):
+        codes[:, j] = pd.Categorical(normalized[column], categories=categories).codes
+    return codes, categories
+
+
+def kappa_from_confusion(confusion):
+    """
+    Cohen's kappa from a square confusion matrix of counts.
+    """
+    total = confusion.sum()
+    if total == 0:
+        return float('nan')
+    observed = np.trace(confusion) / total
+    expected = (confusion.sum(axis=0) * confusion.sum(axis=1)).sum() / (total * total)
+    if expected == 1:
+        return float('nan')
+    return (observed - expected) / (1 - expected)
+
+
+def pairwise_confusions(codes, n_categories):
+    """
+    Confusion matrix for every pair of annotators, over the rows both of them labelled.
+    """
+    confusions = {}
+    for a in range(codes.shape[1]):
+        for b in range(a + 1, codes.shape[1]):
+            both = (codes[:, a] >= 0) & (codes[:, b] >= 0)
+            pairs = codes[both, a].astype(np.int64) * n_categories + codes[both, b]
+            confusions[(a, b)] = np.bincount(pairs, minlength=n_categories * n_categories).reshape(
+                n_categories, n_categories)
+    return confusions
+
+
+def fleiss_kappa(category_counts):
+    """
+    Fleiss' kappa from an (items x categories) matrix of how many annotators chose each category.
+    Every item must have been labelled by the same number of annotators.
+    """
+    n_items = category_counts.shape[0]
+    if n_items == 0:
+        return float('nan')
+    n_raters = category_counts[0].sum()
+    if n_raters < 2:
+        return float('nan')
+    p_item = ((category_counts * category_counts).sum(axis=1) - n_raters) / (n_raters * (n_raters - 1))
+    p_category = category_counts.sum(axis=0) / (n_items * n_raters)
+    observed = p_item.mean()
+    expected = (p_category * p_category).sum()
+    if expected == 1:
+        return float('nan')
+    return (observed - expected) / (1 - expected)
+
+
+def adjudicate(files):
+    """
+    Joins all annotator files and returns (agreements, disagreements, report).
+    Only rows labelled by every annotator are adjudicated, as find_disagreements.py did for two.
+    """
+    texts, labels = load_annotations(files)
+    codes, categories = encode_labels(labels)
+    n_categories = len(categories)
+
+    complete = (codes >= 0).all(axis=1)
+    agreed = complete & (codes == codes[:, :1]).all(axis=1)
+    disputed = complete & ~agreed
+
+    agreements = texts.loc[labels.index[agreed]].copy()
+    # Keep the first annotator's spelling of the agreed label
+    agreements[LABEL_COL] = labels.iloc[agreed, 0].values
+    disagreements = pd.concat([texts.loc[labels.index[disputed]], labels.loc[disputed]], axis=1)
+
+    report = {
+        'annotators': [annotator_name(f) for f in files],
+        'rows': len(labels),
+        'complete_rows': int(complete.sum()),
+        'agreements': int(agreed.sum()),
+        'disagreements': int(disputed.sum()),
+        'pairwise_kappa': {},
+    }
+    for (a, b), confusion in pairwise_confusions(codes, n_categories).items():
+        pair = (report['annotators'][a], report['annotators'][b])
+        report['pairwise_kappa'][pair] = (int(confusion.sum()), kappa_from_confusion(confusion))
+
+    category_counts = np.zeros((int(complete.sum()), n_categories), dtype=np.int64)
+    for j in range(codes.shape[1]):
+        category_counts[np.arange(len(category_counts)), codes[complete, j]] += 1
+    report['fleiss_kappa'] = fleiss_kappa(category_counts)
+    return agreements, disagreements, report
+
+
+def keep_final_polarity(disagreements, filename):
+    """
+    Copies the hand-adjudicated final_polarity values of an existing disagreements file onto the new one.
+    """
+    disagreements = disagreements.copy()
+    disagreements[FINAL_COL] = np.nan
+    if os.path.exists(filename):
+        old = pd.read_csv(filename, dtype=str)
+        if FINAL_COL in old.columns:
+            old.index = [row_key(s, a) for s, a in zip(old[SENTENCE_COL].astype(str), old[ASPECT_COL].astype(str))]
+            old = old[~old.index.duplicated(keep='first')]
+            disagreements[FINAL_COL] = old[FINAL_COL].reindex(disagreements.index).values
+    return disagreements
+
+
+def write_outputs(agreements, disagreements):
+    if disagreements.empty:
+        print("No disagreements found!")
+    else:
+        # Carry over any final_polarity values already adjudicated by hand
+        disagreements = keep_final_polarity(disagreements, DISAGREEMENTS_FILE)
+        disagreements.to_csv(DISAGREEMENTS_FILE, index=False)
+        print(f"Found {len(disagreements)} disagreements. Saved to '{DISAGREEMENTS_FILE}'.")
+
+    if not agreements.empty:
+        agreements.to_csv(AGREEMENTS_FILE, index=False)
+        print(f"Saved {len(agreements)} agreed-upon annotations to '{AGREEMENTS_FILE}'.")
+
+
+# --- Incremental mode ---
+STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    offset INTEGER NOT NULL,
+    header TEXT,
+    fingerprint TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pending (
+    key INTEGER NOT NULL,
+    annotator INTEGER NOT NULL,
+    sentence TEXT NOT NULL,
+    aspect TEXT NOT NULL,
+    label TEXT NOT NULL,
+    code INTEGER NOT NULL,
+    PRIMARY KEY (key, annotator)
+);
+CREATE TABLE IF NOT EXISTS done (key INTEGER PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS written (key INTEGER PRIMARY KEY);
+"""
+# pending: labels of rows not yet labelled by every annotator
+# done:    rows labelled by everyone (counted in the kappa totals)
+# written: rows already in the agreements or disagreements file
+# Only the small running totals in meta are rewritten on every run; the key sets only grow by the new rows.
+STATE_VERSION = 2 # Bump when the schema changes; an older state file is then rebuilt
+SQL_CHUNK = 500   # Keys per "IN (...)" lookup, well below SQLite's limit on query parameters
+
+
+def output_keys():
+    """
+    Keys of the rows already in the agreements and disagreements files.
+    """
+    keys = set()
+    for filename in [AGREEMENTS_FILE, DISAGREEMENTS_FILE]:
+        if os.path.exists(filename):
+            df = pd.read_csv(filename, dtype=str)
+            keys.update(row_key(s, a) for s, a in zip(df[SENTENCE_COL].astype(str), df[ASPECT_COL].astype(str)))
+    return keys
+
+
+def reset_state(conn, files):
+    """
+    Empty running totals. Rows already in the output files are marked as written, so they are not
+    appended again.
+    """
+    n = len(files)
+    for table in ['meta', 'files', 'pending', 'done', 'written']:
+        conn.execute(f'DELETE FROM {table}')
+    conn.executemany('INSERT INTO files VALUES (?, 0, NULL, ?)', [(f, prefix_fingerprint(f, 0)) for f in files])
+    conn.executemany('INSERT INTO written VALUES (?)', [(key,) for key in output_keys()])
+    save_totals(conn, {
+        'annotators': [annotator_name(f) for f in files],
+        'categories': [],
+        'confusion': {f"{a},{b}": [] for a in range(n) for b in range(a + 1, n)},
+        'fleiss': {'items': 0, 'sum_p_item': 0.0, 'category_totals': []},
+    })
+
+
+def save_totals(conn, totals):
+    conn.executemany('INSERT OR REPLACE INTO meta VALUES (?, ?)', [(name, json.dumps(value)) for name, value in totals.items()])
+
+
+def open_state(files):
+    """
+    Opens the state database and returns (connection, running totals).
+    """
+    conn = sqlite3.connect(STATE_FILE)
+    if conn.execute('PRAGMA user_version').fetchone()[0] != STATE_VERSION:
+        conn.executescript('DROP TABLE IF EXISTS meta; DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS pending; '
+                           'DROP TABLE IF EXISTS done; DROP TABLE IF EXISTS written;')
+        conn.execute(f'PRAGMA user_version = {STATE_VERSION}')
+    conn.executescript(STATE_SCHEMA)
+    totals = {name: json.loads(value) for name, value in conn.execute('SELECT name, value FROM meta')}
+    if not totals:
+        with conn:
+            reset_state(conn, files)
+        totals = {name: json.loads(value) for name, value in conn.execute('SELECT name, value FROM meta')}
+    if totals['annotators'] != [annotator_name(f) for f in files]:
+        print(f"Error: The annotator files changed since '{STATE_FILE}' was written. Delete it to rebuild.")
+        sys.exit(1)
+    return conn, totals
+
+
+def read_new_rows(filename, file_state):
+    """
+    Reads only the bytes appended to an annotator file since the last run, seeking past the part
+    read before. That part is only checked by its size and the fingerprint of its ends, so a file
+    that shrank or was re-saved (e.g. from a spreadsheet) is noticed. Returns None in that case.
+    """
+    offset, header, fingerprint = file_state
+    if not prefix_unchanged(filename, offset, fingerprint):
+        return None
+    with open(filename, 'rb') as f:
+        f.seek(offset)
+        data = f.read()
+
+    if header is None:
+        df = pd.read_csv(io.BytesIO(data), dtype=str)
+        header = json.dumps(list(df.columns))
+    elif not data.strip():
+        df = pd.DataFrame(columns=json.loads(header))
+    else:
+        df = pd.read_csv(io.BytesIO(data), header=None, names=json.loads(header), dtype=str)
+    size = offset + len(data)
+    return df.dropna(subset=[LABEL_COL]), (size, header, prefix_fingerprint(filename, size))
+
+
+def category_code(totals, label):
+    """
+    Integer code of a label, growing the confusion matrices and totals when a new label appears.
+    """
+    label = label.strip().lower()
+    if label not in totals['categories']:
+        totals['categories'].append(label)
+        k = len(totals['categories'])
+        for pair, matrix in totals['confusion'].items():
+            for row in matrix:
+                row.append(0)
+            matrix.append([0] * k)
+        totals['fleiss']['category_totals'].append(0)
+    return totals['categories'].index(label)
+
+
+def rebuild_outputs(files):
+    """
+    Rewrites both output files from the complete annotator files, as the full (non-incremental) mode does.
+    """
+    agreements, disagreements, _ = adjudicate(files)
+    write_outputs(agreements, disagreements)
+
+
+def read_all_new_rows(conn, files):
+    """
+    Returns {filename: (new rows, new file state)}, or None if any file was changed in place.
+    """
+    new_rows = {}
+    for filename in files:
+        file_state = conn.execute('SELECT offset, header, fingerprint FROM files WHERE path = ?', (filename,)).fetchone()
+        result = read_new_rows(filename, file_state)
+        if result is None:
+            print(f"'{filename}' was changed above the rows read last time. Rebuilding the outputs and '{STATE_FILE}'.")
+            return None
+        new_rows[filename] = result
+    return new_rows
+
+
+def select_by_keys(conn, query, keys):
+    """
+    Runs a query with an "IN ({})" placeholder for chunks of SQL_CHUNK keys and yields every result row.
+    """
+    keys = list(keys)
+    for start in range(0, len(keys), SQL_CHUNK):
+        chunk = keys[start:start + SQL_CHUNK]
+        yield from conn.execute(query.format(','.join('?' * len(chunk))), chunk)
+
+
+def adjudicate_incremental(files):
+    """
+    Folds the newly appended annotator rows into the running totals and appends the rows that are
+    now labelled by everyone to the agreements or disagreements file.
+    Returns (new agreements, new disagreements, report).
+    """
+    conn, totals = open_state(files)
+    new_rows = read_all_new_rows(conn, files)
+    if new_rows is None:
+        rebuild_outputs(files)
+        with conn:
+            reset_state(conn, files)
+        totals = {name: json.loads(value) for name, value in conn.execute('SELECT name, value FROM meta')}
+        new_rows = read_all_new_rows(conn, files)
+
+    n = len(files)
+    rows = {}
+    for filename in files:
+        df = new_rows[filename][0]
+        sentences = df[SENTENCE_COL].astype(str).tolist()
+        aspects = df[ASPECT_COL].astype(str).tolist()
+        rows[filename] = list(zip([row_key(s, a) for s, a in zip(sentences, aspects)], sentences, aspects, df[LABEL_COL]))
+
+    # Look up the state of just the keys of the new rows, a chunk of keys per query
+    new_keys = {key for file_rows in rows.values() for key, _, _, _ in file_rows}
+    done = {key for key, in select_by_keys(conn, 'SELECT key FROM done WHERE key IN ({})', new_keys)}
+    written = {key for key, in select_by_keys(conn, 'SELECT key FROM written WHERE key IN ({})', new_keys)}
+    pending = {}
+    for key, b, sentence, aspect, label, code in select_by_keys(
+            conn, 'SELECT key, annotator, sentence, aspect, label, code FROM pending WHERE key IN ({})', new_keys):
+        pending.setdefault(key, []).append((b, label, code))
+
+    completed = []
+    ignored = 0
+    new_pending = []
+    for a, filename in enumerate(files):
+        for key, sentence, aspect, label in rows[filename]:
+            if key in done:
+                # Rows are adjudicated once; later relabels of the same row are not counted
+                ignored += 1
+                continue
+            others = pending.get(key, [])
+            if any(b == a for b, _, _ in others):
+                ignored += 1
+                continue
+            code = category_code(totals, label)
+            # Every annotator who already labelled this row gets one more pair in the confusion matrix
+            for b, other_label, other_code in others:
+                first, second = (b, a) if b < a else (a, b)
+                row, col = (other_code, code) if b < a else (code, other_code)
+                totals['confusion'][f"{first},{second}"][row][col] += 1
+            if len(others) + 1 == n:
+                by_annotator = {b: (other_label, other_code) for b, other_label, other_code in others}
+                by_annotator[a] = (label, code)
+                completed.append((key, sentence, aspect, by_annotator))
+                done.add(key)
+                pending.pop(key, None)
+            else:
+                pending.setdefault(key, []).append((a, label, code))
+                new_pending.append((key, a, sentence, aspect, label, code))
+
+    new_agreements = []
+    new_disagreements = []
+    new_written = []
+    for key, sentence, aspect, by_annotator in completed:
+        labels = [by_annotator[a][0] for a in range(n)]
+        codes = [by_annotator[a][1] for a in range(n)]
+
+        # Fleiss' kappa running totals
+        counts = np.bincount(codes, minlength=len(totals['categories']))
+        totals['fleiss']['items'] += 1
+        totals['fleiss']['sum_p_item'] += float(((counts * counts).sum() - n) / (n * (n - 1)))
+        for code, count in enumerate(counts):
+            totals['fleiss']['category_totals'][code] += int(count)
+
+        if key in written:
+            continue
+        written.add(key)
+        new_written.append((key,))
+        if len(set(codes)) == 1:
+            new_agreements.append({SENTENCE_COL: sentence, ASPECT_COL: aspect, LABEL_COL: labels[0]})
+        else:
+            row = {SENTENCE_COL: sentence, ASPECT_COL: aspect}
+            for name, label in zip(totals['annotators'], labels):
+                row[name + '_label'] = label
+            new_disagreements.append(row)
+
+    # One transaction: the state only changes if the whole run succeeds
+    completed_keys = [(key,) for key, _, _, _ in completed]
+    with conn:
+        conn.executemany('DELETE FROM pending WHERE key = ?', completed_keys)
+        # Rows labelled and completed within this run never reach the pending table
+        conn.executemany('INSERT INTO pending VALUES (?, ?, ?, ?, ?, ?)', [entry for entry in new_pending if entry[0] not in done])
+        conn.executemany('INSERT INTO done VALUES (?)', completed_keys)
+        conn.executemany('INSERT INTO written VALUES (?)', new_written)
+        conn.executemany('UPDATE files SET offset = ?, header = ?, fingerprint = ? WHERE path = ?',
+                         [new_rows[filename][1] + (filename,) for filename in files])
+        save_totals(conn, totals)
+
+        done_count = conn.execute('SELECT COUNT(*) FROM done').fetchone()[0]
+        pending_count = conn.execute('SELECT COUNT(DISTINCT key) FROM pending').fetchone()[0]
+
+        # Append before the state is committed, so a crash in between re-appends rather than loses rows
+        append_rows(pd.DataFrame(new_agreements, columns=[SENTENCE_COL, ASPECT_COL, LABEL_COL]), AGREEMENTS_FILE)
+        disagreement_columns = [SENTENCE_COL, ASPECT_COL] + [name + '_label' for name in totals['annotators']] + [FINAL_COL]
+        append_rows(pd.DataFrame(new_disagreements, columns=disagreement_columns), DISAGREEMENTS_FILE)
+    conn.close()
+
+    report = {
+        'annotators': totals['annotators'],
+        'rows': done_count + pending_count,
+        'complete_rows': done_count,
+        'new_rows': len(completed),
+        'ignored_rows': ignored,
+        'pairwise_kappa': {},
+    }
+    for pair, matrix in totals['confusion'].items():
+        a, b = [int(i) for i in pair.split(',')]
+        confusion = np.array(matrix, dtype=np.int64).reshape(len(totals['categories']), len(totals['categories']))
+        names = (totals['annotators'][a], totals['annotators'][b])
+        report['pairwise_kappa'][names] = (int(confusion.sum()), kappa_from_confusion(confusion))
+
+    fleiss = totals['fleiss']
+    if fleiss['items'] == 0 or n < 2:
+        report['fleiss_kappa'] = float('nan')
+    else:
+        observed = fleiss['sum_p_item'] / fleiss['items']
+        p_category = np.array(fleiss['category_totals'], dtype=float) / (fleiss['items'] * n)
+        expected = (p_category * p_category).sum()
+        report['fleiss_kappa'] = float('nan') if expected == 1 else (observed - expected) / (1 - expected)
+    return new_agreements, new_disagreements, report
+
+
+def append_rows(df, filename):
+    """
+    Appends rows to a CSV, matching the columns already in it (so final_polarity stays where it is).
+    """
+    if df.empty:
+        return
+    if os.path.exists(filename):
+        columns = list(pd.read_csv(filename, nrows=0).columns)
+        df.reindex(columns=columns).to_csv(filename, mode='a', header=False, index=False)
+    else:
+        df.to_csv(filename, index=False)
+
+
+def print_report(report):
+    print(f"--- Inter-Annotator Agreement (IAA) ---")
+    print(f"Annotators: {', '.join(report['annotators'])}")
+    print(f"Rows labelled by everyone: {report['complete_rows']} of {report['rows']}")
+    if 'new_rows' in report:
+        print(f"Newly completed rows: {report['new_rows']} ({report['ignored_rows']} repeated labels ignored)")
+    for (a, b), (count, kappa) in report['pairwise_kappa'].items():
+        print(f"Cohen's Kappa {a} vs {b}: {kappa:.4f} ({count} annotations)")
+    print(f"Fleiss' Kappa (all annotators): {report['fleiss_kappa']:.4f}")
+    print("------------------------------------------")
+
+
+if __name__ == "__main__":
+    if len(ANNOTATOR_FILES) < 2:
+        print("Error: Need at least two annotator files (annotator_1.csv, annotator_2.csv, ...) in the directory.")
+        sys.exit(1)
+
+    profiler = StageProfiler('adjudicate').start()
+    if INCREMENTAL:
+        # Reading, joining and appending are interleaved here, so the stage is timed as one step
+        with profiler.step('adjudicate'):
+            new_agreements, new_disagreements, report = adjudicate_incremental(ANNOTATOR_FILES)
+        print_report(report)
+        print(f"Appended {len(new_disagreements)} new disagreements to '{DISAGREEMENTS_FILE}'.")
+        print(f"Appended {len(new_agreements)} new agreed-upon annotations to '{AGREEMENTS_FILE}'.")
+        profiler.finish(rows=len(new_agreements) + len(new_disagreements))
+        sys.exit(0)
+
+    # Reading the annotator files and the hash join
+    with profiler.step('adjudicate'):
+        agreements, disagreements, report = adjudicate(ANNOTATOR_FILES)
+    print_report(report)
+
+    # --- Save Files ---
+    with profiler.step('write'):
+        write_outputs(agreements, disagreements)
+    profiler.finish(rows=report['rows'])
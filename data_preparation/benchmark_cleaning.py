@@ -0,0 +1,48 @@
+# Microbenchmark: per-row clean_text vs the vectorized cleaning engine
+# Also checks that both produce byte-identical output on the raw data.
+# Import necessary libraries
+import glob
+import sys
+import time
+import pandas as pd
+from clean_data import clean_text, COMMENT_COLUMN_NAME
+from text_cleaning import clean_series, clean_series_parallel
+
+# --- Configuration ---
+INPUT_GLOB = 'raw_data/*.csv'
+REPEAT = 20           # Copies of the raw data to stack, so the timings are not dominated by noise
+N_PROCESSES = [2, 4]  # Process pool sizes to try
+# ---------------------
+
+def timed(label, func, texts):
+    start = time.perf_counter()
+    result = func(texts)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {len(texts):>9} rows  {elapsed:>8.2f} s  {len(texts) / elapsed:>11.1f} rows/s")
+    return result, elapsed
+
+
+if __name__ == "__main__":
+    input_files = sorted(glob.glob(INPUT_GLOB))
+    if not input_files:
+        print(f"Error: No CSV files found matching '{INPUT_GLOB}'.")
+        sys.exit(1)
+
+    texts = pd.concat([pd.read_csv(f)[COMMENT_COLUMN_NAME] for f in input_files], ignore_index=True)
+    texts = pd.concat([texts] * REPEAT, ignore_index=True)
+    print(f"--- Text cleaning benchmark ({len(input_files)} files x {REPEAT}) ---")
+
+    expected, baseline = timed("apply(clean_text)", lambda s: s.astype(str).apply(clean_text), texts)
+    candidates = [("clean_series", clean_series)]
+    for n_process in N_PROCESSES:
+        candidates.append((f"clean_series_parallel({n_process})",
+                           lambda s, n=n_process: clean_series_parallel(s, n)))
+
+    for label, func in candidates:
+        result, elapsed = timed(label, func, texts)
+        identical = expected.to_csv(index=False) == result.to_csv(index=False)
+        print(f"{'':<28} speed-up: {baseline / elapsed:.2f}x  identical output: {identical}")
+        if not identical:
+            print("Error: The cleaning engine does not match clean_text.")
+            sys.exit(1)
+    print("------------------------------------------")
@@ -0,0 +1,166 @@
+# Benchmark the pipeline stages on synthetic data and compare against saved baselines
+# Usage: python benchmark_pipeline.py [--save-baseline] [N_ROWS ...]   (defaults to SIZES)
+#
+# For each size the synthetic inputs are generated once (generate_synthetic_data.py) into
+# WORK_DIR/<size>/, then every stage script is run REPEAT times in a fresh process. Timings come
+# from the run report each stage writes (instrumentation.py), so interpreter start-up is excluded
+# and per-step times are available. The median of the repeats is compared against BASELINE_FILE.
+# Runs offline on CPU; the spaCy stages are skipped if the model is not installed.
+# Import necessary libraries
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from generate_synthetic_data import generate
+from instrumentation import REPORT_JSON
+
+# --- Configuration ---
+SIZES = [10000]                # Comment rows per benchmark (up to 10M; see SPACY_MAX_ROWS)
+REPEAT = 3                     # Runs per stage; the median is reported
+WORK_DIR = 'benchmark_data'    # Generated inputs and stage outputs
+BASELINE_FILE = 'benchmark_baselines.json'
+TOLERANCE = 0.10               # Slower than the baseline by more than this counts as a regression
+MIN_DELTA = 0.05               # ...and by more than this many seconds (ignores noise on very short stages)
+SPACY_MAX_ROWS = 100000        # Larger sizes skip the spaCy stages, which would take hours
+# ---------------------
+
+# (name, script, arguments, needs spaCy). Run in order inside the size's directory.
+STAGES = [
+    ('clean', 'clean_data.py', [], False),
+    ('split_and_extract', 'split_and_extract.py', [], True),
+    ('adjudicate', 'adjudicate.py', [], False),
+    ('convert_mams', 'convert_mams_to_raw.py', ['MAMS_train.xml'], False),
+    ('dependency_graphs', 'build_dependency_graphs.py', ['MAMS_train.raw'], True),
+]
+# Files a stage leaves behind that would make the next repeat faster than the first
+STAGE_CACHES = {'dependency_graphs': ['dependency_cache.pkl']}
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def spacy_available():
+    try:
+        from spacy_pipeline import MODEL_NAME
+        import spacy.util
+    except ImportError:
+        return False
+    return spacy.util.is_package(MODEL_NAME)
+
+
+def prepare(n_rows):
+    """
+    Returns the directory with the synthetic inputs for n_rows, generating them the first time.
+    """
+    data_dir = os.path.join(WORK_DIR, str(n_rows))
+    marker = os.path.join(data_dir, '.generated')
+    if not os.path.exists(marker):
+        print(f"Generating {n_rows} synthetic rows in '{data_dir}'...")
+        generate(n_rows, data_dir)
+        open(marker, 'w').close()
+    return data_dir
+
+
+def run_once(name, script, args, data_dir):
+    """
+    Runs a stage script in data_dir and returns the record it appended to its run report.
+    """
+    for cache_file in STAGE_CACHES.get(name, []):
+        if os.path.exists(os.path.join(data_dir, cache_file)):
+            os.remove(os.path.join(data_dir, cache_file))
+    report = os.path.join(data_dir, REPORT_JSON)
+    if os.path.exists(report):
+        os.remove(report)
+
+    command = [sys.executable, os.path.join(SCRIPT_DIR, script)] + args
+    result = subprocess.run(command, cwd=data_dir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            universal_newlines=True)
+    if result.returncode != 0 or not os.path.exists(report):
+        print(result.stdout.rstrip())
+        print(f"Error: Stage '{name}' failed (exit code {result.returncode}).")
+        sys.exit(1)
+    with open(report, 'r', encoding='utf-8') as f:
+        return json.loads(f.readlines()[-1])
+
+
+def summarize(records):
+    """
+    Median seconds, rows/s and per-step seconds over the repeat runs.
+    """
+    seconds = statistics.median(r['seconds'] for r in records)
+    rows = records[0]['rows']
+    steps = {}
+    for step in records[0]['steps']:
+        steps[step] = round(statistics.median(r['steps'][step]['seconds'] for r in records), 4)
+    return {
+        'seconds': round(seconds, 4),
+        'min_seconds': round(min(r['seconds'] for r in records), 4),
+        'rows': rows,
+        'rows_per_second': round(rows / seconds, 1) if rows and seconds > 0 else None,
+        'peak_rss_mb': max((r['peak_rss_mb'] for r in records if r['peak_rss_mb'] is not None), default=None),
+        'steps': steps,
+    }
+
+
+def load_baselines():
+    if not os.path.exists(BASELINE_FILE):
+        return {}
+    with open(BASELINE_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baselines(baselines):
+    # Write to a temporary file first so an interrupted run never leaves a broken baseline file
+    with open(BASELINE_FILE + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(baselines, f, indent=2)
+    os.replace(BASELINE_FILE + '.tmp', BASELINE_FILE)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    save_baseline = '--save-baseline' in args
+    sizes = [int(arg) for arg in args if arg != '--save-baseline'] or SIZES
+
+    has_spacy = spacy_available()
+    if not has_spacy:
+        print("Note: spaCy model not installed. Skipping the spaCy stages.")
+
+    baselines = load_baselines()
+    results = {}
+    regressions = []
+    print(f"{'stage':<20} {'rows':>10} {'median s':>10} {'rows/s':>12} {'baseline s':>11} {'change':>8}")
+    for n_rows in sizes:
+        data_dir = prepare(n_rows)
+        results[str(n_rows)] = {}
+        print(f"--- {n_rows} rows ---")
+        for name, script, stage_args, needs_spacy in STAGES:
+            if needs_spacy and (not has_spacy or n_rows > SPACY_MAX_ROWS):
+                continue
+            summary = summarize([run_once(name, script, stage_args, data_dir) for _ in range(REPEAT)])
+            results[str(n_rows)][name] = summary
+
+            baseline = baselines.get('results', {}).get(str(n_rows), {}).get(name)
+            change = ''
+            baseline_seconds = ''
+            if baseline is not None:
+                ratio = summary['seconds'] / baseline['seconds'] if baseline['seconds'] > 0 else 1.0
+                change = f"{(ratio - 1) * 100:+.1f}%"
+                baseline_seconds = f"{baseline['seconds']:.3f}"
+                if ratio > 1 + TOLERANCE and summary['seconds'] - baseline['seconds'] > MIN_DELTA:
+                    regressions.append((n_rows, name, ratio))
+            rate = f"{summary['rows_per_second']:.0f}" if summary['rows_per_second'] else '-'
+            print(f"{name:<20} {summary['rows'] or 0:>10} {summary['seconds']:>10.3f} {rate:>12} "
+                  f"{baseline_seconds:>11} {change:>8}")
+
+    if save_baseline:
+        baselines.setdefault('results', {}).update(results)
+        baselines['machine'] = {'platform': platform.platform(), 'python': platform.python_version(),
+                                'cpu_count': os.cpu_count()}
+        save_baselines(baselines)
+        print(f"Baselines saved to '{BASELINE_FILE}'.")
+
+    if regressions:
+        for n_rows, name, ratio in regressions:
+            print(f"Regression: '{name}' at {n_rows} rows is {(ratio - 1) * 100:.1f}% slower than the baseline.")
+        sys.exit(1)
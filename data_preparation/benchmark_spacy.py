@@ -0,0 +1,65 @@
+# Benchmark: sentence splitting with the old one-row-at-a-time loop vs the batched spaCy engine
+# Import necessary libraries
+import sys
+import time
+from spacy_pipeline import load_nlp, process_texts, SENTENCE_DISABLE
+from split_sentences import sentence_texts
+from table_io import existing_table, read_table
+
+# --- Configuration ---
+INPUT_CSV = 'all_comments_cleaned.csv' # The output from Step 1
+TEXT_COLUMN = 'cleaned_text'
+MAX_ROWS = 5000           # Number of comments to benchmark on (None for all of them)
+BATCH_SIZES = [100, 1000] # nlp.pipe batch sizes to try
+N_PROCESSES = [1, 2, 4]   # Worker process counts to try
+# ---------------------
+
+def run_loop(comments):
+    """
+    The original approach: full pipeline, one nlp(text) call per comment.
+    """
+    nlp = load_nlp()
+    count = 0
+    for comment in comments:
+        count += len(sentence_texts(nlp(comment)))
+    return count
+
+
+def run_engine(comments, batch_size, n_process):
+    """
+    The batched engine, with the components sentence splitting does not need disabled.
+    """
+    count = 0
+    for sentences in process_texts(comments, sentence_texts, disable=SENTENCE_DISABLE,
+                                   batch_size=batch_size, n_process=n_process):
+        count += len(sentences)
+    return count
+
+
+def timed(label, func, *args):
+    # Model loading is part of the cost of every run, so it is included in the timing
+    start = time.perf_counter()
+    count = func(*args)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {count:>8} sentences  {elapsed:>8.2f} s  {count / elapsed:>10.1f} sentences/s")
+    return count, elapsed
+
+
+if __name__ == "__main__":
+    input_file = existing_table(INPUT_CSV)
+    try:
+        df = read_table(input_file, columns=[TEXT_COLUMN], nrows=MAX_ROWS)
+    except FileNotFoundError:
+        print(f"Error: Input file '{input_file}' not found.") # Inform the user if the input file is missing
+        sys.exit(1)
+
+    comments = df[TEXT_COLUMN].astype(str).tolist()
+    print(f"--- spaCy sentence splitting benchmark ({len(comments)} comments) ---")
+
+    _, baseline = timed("loop nlp(text)", run_loop, comments)
+    for batch_size in BATCH_SIZES:
+        for n_process in N_PROCESSES:
+            label = f"pipe batch={batch_size} procs={n_process}"
+            _, elapsed = timed(label, run_engine, comments, batch_size, n_process)
+            print(f"{'':<32} speed-up vs loop: {baseline / elapsed:.2f}x")
+    print("------------------------------------------")
@@ -0,0 +1,138 @@
+# Build the ASGCN .graph (undirected) and .tree (directed) adjacency files for .raw datasets
+# Usage: python build_dependency_graphs.py [file.raw ...]   (defaults to the files written by convert_to_raw.py)
+# Import necessary libraries
+import hashlib
+import os
+import pickle
+import sys
+import numpy as np
+from spacy_pipeline import process_texts, DEPENDENCY_DISABLE
+from raw_dataset import read_raw, full_text
+from adjacency_store import save_adjacency
+from instrumentation import StageProfiler
+
+# --- Configuration ---
+RAW_FILES = ['reddit_train.raw', 'reddit_test.raw'] # Files to process when none are given on the command line
+CACHE_FILE = 'dependency_cache.pkl'  # Parses of every sentence seen so far, keyed by text hash
+WRITE_NPZ = False                    # Also write the compact .graph.npz/.tree.npz files (see adjacency_store.py)
+BATCH_SIZE = 1000 # Sentences per nlp.pipe batch
+N_PROCESS = 1     # Worker processes for spaCy (set higher for MAMS-sized files)
+# ---------------------
+
+def text_key(text):
+    """
+    Compact cache key for a sentence.
+    """
+    return hashlib.sha1(text.encode('utf-8')).digest()
+
+
+def dependency_arcs(doc):
+    """
+    Returns (number of tokens, [(head, child), ...]) for a parsed sentence.
+    """
+    arcs = []
+    for token in doc:
+        for child in token.children:
+            arcs.append((token.i, child.i))
+    return len(doc), arcs
+
+
+def adjacency_matrices(n, arcs):
+    """
+    Builds the undirected (graph) and directed (tree) matrices the way ASGCN's
+    dependency_graph.py and dependency_tree.py do: self loops plus head -> child arcs.
+    """
+    graph = np.identity(n, dtype='float32')
+    tree = np.identity(n, dtype='float32')
+    for head, child in arcs:
+        graph[head][child] = 1
+        graph[child][head] = 1
+        tree[head][child] = 1
+    return graph, tree
+
+
+def load_cache(filename):
+    if not os.path.exists(filename):
+        return {}
+    with open(filename, 'rb') as f:
+        return pickle.load(f)
+
+
+def save_cache(cache, filename):
+    # Write to a temporary file first so an interrupted run never leaves a broken cache
+    tmp_filename = filename + '.tmp'
+    with open(tmp_filename, 'wb') as f:
+        pickle.dump(cache, f)
+    os.replace(tmp_filename, filename)
+
+
+def build_graphs(raw_files, cache, profiler):
+    """
+    Parses every sentence not already in the cache, then writes <file>.graph and <file>.tree
+    for each input file. Returns the number of entries.
+    """
+    # Read all entries first so sentences shared between files (or aspects) are parsed once
+    entries = {}
+    pending = {}
+    with profiler.step('read'):
+        for filename in raw_files:
+            entries[filename] = []
+            for index, text_left, aspect, text_right, _ in read_raw(filename):
+                text = full_text(text_left, aspect, text_right)
+                key = text_key(text)
+                entries[filename].append((index, key, len(text.split())))
+                if key not in cache:
+                    pending[key] = text
+
+    print(f"{sum(len(e) for e in entries.values())} entries, {len(pending)} sentences to parse "
+          f"({len(cache)} already cached).")
+
+    keys = list(pending)
+    texts = [pending[key] for key in keys]
+    results = process_texts(texts, dependency_arcs, disable=DEPENDENCY_DISABLE, batch_size=BATCH_SIZE,
+                            n_process=N_PROCESS, whitespace_tokens=True)
+    for key, result in zip(keys, profiler.iterate('parse', results)):
+        cache[key] = result
+
+    for filename, file_entries in entries.items():
+        idx2graph = {}
+        idx2tree = {}
+        with profiler.step('build', rows=len(file_entries)):
+            for index, key, n_words in file_entries:
+                n, arcs = cache[key]
+                # The whitespace tokenizer keeps one token per word, so the matrices match ASGCN's tokens
+                if n != n_words:
+                    print(f"Error: Entry at line {index + 1} of '{filename}' was parsed into {n} tokens "
+                          f"but has {n_words} words. Delete '{CACHE_FILE}' and try again.")
+                    sys.exit(1)
+                idx2graph[index], idx2tree[index] = adjacency_matrices(n, arcs)
+
+        with profiler.step('write'):
+            with open(filename + '.graph', 'wb') as f:
+                pickle.dump(idx2graph, f)
+            with open(filename + '.tree', 'wb') as f:
+                pickle.dump(idx2tree, f)
+            if WRITE_NPZ:
+                save_adjacency(idx2graph, filename + '.graph.npz')
+                save_adjacency(idx2tree, filename + '.tree.npz')
+        print(f"Saved {len(idx2graph)} graphs to '{filename}.graph' and '{filename}.tree'.")
+
+    return sum(len(e) for e in entries.values())
+
+
+if __name__ == "__main__":
+    raw_files = sys.argv[1:] or RAW_FILES
+
+    for filename in raw_files:
+        if not os.path.exists(filename):
+            print(f"Error: Input file '{filename}' not found.") # Inform the user if an input file is missing
+            sys.exit(1)
+
+    profiler = StageProfiler('build_dependency_graphs').start()
+    with profiler.step('cache'):
+        cache = load_cache(CACHE_FILE)
+    count = build_graphs(raw_files, cache, profiler)
+    with profiler.step('cache'):
+        save_cache(cache, CACHE_FILE)
+    print("Done.")
+    profiler.finish(rows=count)
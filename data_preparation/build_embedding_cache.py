@@ -0,0 +1,136 @@
+# Build a shared vocabulary and the matching subset of a pretrained embedding file for the datasets
+# Usage (from the repository root):
+#   python data_preparation/build_embedding_cache.py [embedding_file [file.raw ...]]
+# (defaults: EMBEDDING_FILE and every .raw file under datasets/)
+#
+# ASGCN builds its vocabulary from the .raw files and then scans the whole multi-GB GloVe text
+# file for every new dataset, which dominates startup for small datasets such as reddit. This
+# script builds one vocabulary over all the .raw files (same indices as ASGCN's Tokenizer:
+# '<pad>' is 0, '<unk>' is 1) and streams the embedding file once, parsing only the lines
+# whose word is in the vocabulary. It writes to OUTPUT_DIR:
+#
+#   word2idx.json               the shared word index (usable as packed_dataset.py's VOCAB_FILE)
+#   embedding_matrix_<dim>.npy  float32 [len(word2idx), dim]; row 0 is zeros, row 1 is uniform
+#                               random like ASGCN, and words missing from the file stay zeros
+#   manifest.json               the files and settings the cache was built from
+#
+# load_embedding_cache() opens the matrix with mmap_mode='r', so training runs load it in
+# milliseconds. If no input changed since the last build, the script does nothing.
+# Import necessary libraries
+import glob
+import json
+import os
+import sys
+import time
+import numpy as np
+from raw_dataset import build_vocab
+
+# --- Configuration ---
+EMBEDDING_FILE = 'glove/glove.840B.300d.txt' # Local GloVe-style text file: word followed by EMBED_DIM values per line
+EMBED_DIM = 300
+RAW_GLOB = 'datasets/*/*.raw'
+OUTPUT_DIR = 'datasets/embedding_cache'
+SEED = 8240 # For the '<unk>' row
+# ---------------------
+
+
+def file_signature(path):
+    stat = os.stat(path)
+    return [os.path.abspath(path), stat.st_mtime_ns, stat.st_size]
+
+
+def stream_vectors(filename, vocab, dim):
+    """
+    Streams an embedding text file and yields (word, vector) for the words in vocab.
+    Lines of other words are never split or parsed. Lines that do not split into a word and
+    dim values (e.g. the few glove.840B entries whose "word" contains spaces) are skipped.
+    A word that appears on several lines is yielded each time; like ASGCN's load_word_vec,
+    the caller keeps the last one, so the whole file is always read.
+    """
+    wanted = {word.encode('utf-8') for word in vocab}
+    with open(filename, 'rb', buffering=1 << 20) as f:
+        for line in f:
+            word = line[:line.find(b' ')]
+            if word not in wanted:
+                continue
+            parts = line.rstrip().split(b' ')
+            if len(parts) != dim + 1:
+                continue # A word with spaces that only starts like a vocabulary word, or a malformed line
+            yield word.decode('utf-8'), np.array(parts[1:], dtype=np.float32)
+
+
+def build_embedding_matrix(word2idx, embedding_file, dim, seed=SEED):
+    """
+    Returns (matrix, words found), following ASGCN's build_embedding_matrix.
+    """
+    matrix = np.zeros((len(word2idx), dim), dtype=np.float32)
+    rng = np.random.RandomState(seed)
+    matrix[1, :] = rng.uniform(-1 / np.sqrt(dim), 1 / np.sqrt(dim), (1, dim))
+    found = set()
+    for word, vector in stream_vectors(embedding_file, word2idx, dim):
+        matrix[word2idx[word]] = vector # A later duplicate overwrites an earlier one, as in ASGCN
+        found.add(word)
+    return matrix, len(found)
+
+
+def matrix_path(output_dir, dim):
+    return os.path.join(output_dir, f'embedding_matrix_{dim}.npy')
+
+
+def load_embedding_cache(output_dir=OUTPUT_DIR, dim=EMBED_DIM):
+    """
+    Returns (word2idx, memory-mapped embedding matrix).
+    """
+    with open(os.path.join(output_dir, 'word2idx.json'), 'r', encoding='utf-8') as f:
+        word2idx = json.load(f)
+    return word2idx, np.load(matrix_path(output_dir, dim), mmap_mode='r')
+
+
+def write_atomic(path, write):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+if __name__ == "__main__":
+    embedding_file = sys.argv[1] if len(sys.argv) > 1 else EMBEDDING_FILE
+    raw_files = sys.argv[2:] if len(sys.argv) > 2 else sorted(glob.glob(RAW_GLOB))
+    if not os.path.exists(embedding_file):
+        print(f"Error: Embedding file '{embedding_file}' not found.") # Inform the user if the input file is missing
+        sys.exit(1)
+    missing = [f for f in raw_files if not os.path.exists(f)]
+    if not raw_files or missing:
+        print(f"Error: Input file '{missing[0] if missing else RAW_GLOB}' not found.")
+        sys.exit(1)
+
+    manifest = {'embedding_file': file_signature(embedding_file), 'embed_dim': EMBED_DIM, 'seed': SEED,
+                'raw_files': [file_signature(f) for f in raw_files]}
+    manifest_file = os.path.join(OUTPUT_DIR, 'manifest.json')
+    if os.path.exists(manifest_file) and os.path.exists(matrix_path(OUTPUT_DIR, EMBED_DIM)):
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+        if {k: v for k, v in previous.items() if k in manifest} == manifest:
+            print(f"Embedding cache in '{OUTPUT_DIR}' is up to date ({previous['vocab_size']} words).")
+            sys.exit(0)
+
+    start = time.perf_counter()
+    word2idx = build_vocab(raw_files)
+    print(f"Vocabulary: {len(word2idx)} words from {len(raw_files)} files.")
+    matrix, found = build_embedding_matrix(word2idx, embedding_file, EMBED_DIM)
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    write_atomic(matrix_path(OUTPUT_DIR, EMBED_DIM), lambda f: np.save(f, matrix))
+    write_atomic(os.path.join(OUTPUT_DIR, 'word2idx.json'), lambda f: f.write(json.dumps(word2idx).encode('utf-8')))
+    manifest['vocab_size'] = len(word2idx)
+    manifest['found'] = found
+    write_atomic(manifest_file, lambda f: f.write(json.dumps(manifest, indent=2).encode('utf-8')))
+
+    # Both special tokens are never in the embedding file
+    print(f"Found vectors for {found} of {len(word2idx) - 2} words ({found / max(len(word2idx) - 2, 1):.1%}) "
+          f"in {time.perf_counter() - start:.1f} s.")
+    print(f"New files created in '{OUTPUT_DIR}': word2idx.json, {os.path.basename(matrix_path(OUTPUT_DIR, EMBED_DIM))}")
+
+    start = time.perf_counter()
+    load_embedding_cache(OUTPUT_DIR, EMBED_DIM)
+    print(f"Loading the cache takes {(time.perf_counter() - start) * 1000:.1f} ms.")
@@ -3,6 +3,7 @@
 import pandas as pd
 from sklearn.metrics import cohen_kappa_score
 import sys
+from instrumentation import StageProfiler
 
 # --- Configuration ---
 FILE_1 = 'annotator_1.csv'
@@ -10,9 +11,11 @@ FILE_2 = 'annotator_2.csv'
 LABEL_COLUMN = 'polarity'
 # ---------------------
 
+profiler = StageProfiler('calculate_iaa').start()
 try:
-    df1 = pd.read_csv(FILE_1)
-    df2 = pd.read_csv(FILE_2)
+    with profiler.step('read'):
+        df1 = pd.read_csv(FILE_1)
+        df2 = pd.read_csv(FILE_2)
 except FileNotFoundError as e:
     print(f"Error: Could not find file. Make sure '{FILE_1}' and '{FILE_2}' are in the directory.") # Inform the user if the files are missing
     print(e)
@@ -38,9 +41,11 @@ labels_1 = df1[LABEL_COLUMN]
 labels_2 = df2[LABEL_COLUMN]
 
 # Calculate Cohen's Kappa
-kappa = cohen_kappa_score(labels_1, labels_2)
+with profiler.step('kappa', rows=len(labels_1)):
+    kappa = cohen_kappa_score(labels_1, labels_2)
 
 print(f"--- Inter-Annotator Agreement (IAA) ---")
 print(f"Compared {len(labels_1)} annotations.")
 print(f"Cohen's Kappa Score: {kappa:.4f}")
-print("------------------------------------------")
\ No newline at end of file
+print("------------------------------------------")
+profiler.finish(rows=len(labels_1))
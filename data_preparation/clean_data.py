@@ -5,6 +5,12 @@ import ftfy # for fixing text encoding issues
 import re
 import sys
 import glob
+import json
+import os
+from text_cleaning import clean_series_parallel
+from instrumentation import StageProfiler
+from table_io import intermediate_path, write_table
+from file_hashes import prefix_fingerprint, prefix_unchanged
 
 # --- Configuration ---
 # Use glob to find all the raw comment files.
@@ -12,77 +18,208 @@ import glob
 input_files = glob.glob('raw_data/*.csv')
 output_file = 'all_comments_cleaned.csv'
 # This is the name of the column in the CSVs that contains the comments
-COMMENT_COLUMN_NAME = 'comment_text' 
+COMMENT_COLUMN_NAME = 'comment_text'
+# The next steps only read 'cleaned_text'. False writes just the comment and its cleaned version,
+# as streaming mode does, instead of every column of the raw files.
+KEEP_ORIGINAL_COLUMNS = True
+
+# Streaming mode reads each file in chunks and appends to the output as it goes,
+# so memory stays bounded and an interrupted run picks up where it stopped.
+# It always writes CSV (the checkpoint is a byte offset); otherwise the output is written
+# in table_io.INTERMEDIATE_FORMAT.
+# Rows appended to a raw file later (scrape_reddit_concurrent.py with INCREMENTAL = True)
+# are the only ones cleaned on the next streaming run.
+STREAMING = False
+CHUNK_SIZE = 10000 # Rows per chunk in streaming mode
+CHECKPOINT_FILE = 'clean_data_checkpoint.json' # Progress of the streaming mode (delete it to start over)
+N_PROCESS = 1 # Worker processes for cleaning (set higher for large corpora)
 # ---------------------
 
 # --- Cleaning Function ---
 def clean_text(text):
     """
     Applies a series of cleaning steps to a single piece of text.
+    This is the reference implementation; the scripts use the faster, identical
+    text_cleaning.clean_series on whole columns.
     """
     # 1. Fix encoding errors (e.g., 'â€™' -> ''')
     text = ftfy.fix_text(text)
-    
+
     # 2. Remove URLs
     text = re.sub(r'https?://\S+|www\.\S+', '', text)
-    
+
     # 3. Remove Reddit user/subreddit mentions (u/ and r/)
     text = re.sub(r'u/\w+|r/\w+', '', text)
-    
+
     # 4. Remove special tokens and junk
     text = re.sub(r'\[deleted\]|\[removed\]|#NAME\?', '', text, flags=re.IGNORECASE)
-    
+
     # 5. Convert to lowercase
     text = text.lower()
-    
+
     # 6. Remove non-alphanumeric/punctuation (keeps letters, numbers, and basic punctuation)
     # This will remove most emojis like 'ðŸ¥²'
     text = re.sub(r'[^a-z0-9\s.,\'"-]', '', text)
-    
+
     # 7. Normalize whitespace (replaces newlines, tabs, and multiple spaces with a single space)
     # This fixes multi-line comments.
     text = re.sub(r'\s+', ' ', text).strip()
-    
+
     return text
 
-# --- Main execution ---
-if not input_files:
-    # If no files found, inform the user and exit
-    print("Error: No CSV files found in the 'raw_data' folder.")
-    print("Please create a folder named 'raw_data' and put your CSVs in it.")
-    sys.exit(1)
-
-print(f"Found {len(input_files)} files to combine and clean.")
-
-# Read and combine all CSV files
-all_dfs = []
-for f in input_files:
-    try:
-        # Read each CSV file
-        df = pd.read_csv(f)
-        if COMMENT_COLUMN_NAME not in df.columns:
-            print(f"Warning: '{COMMENT_COLUMN_NAME}' not in {f}. Skipping this file.") # Warn if column not found
+
+def clean_all(profiler):
+    """
+    Reads every raw file at once, cleans them and writes a single output file.
+    """
+    # Read and combine all CSV files
+    all_dfs = []
+    for f in input_files:
+        try:
+            # Read each CSV file
+            with profiler.step('read'):
+                df = pd.read_csv(f)
+            if COMMENT_COLUMN_NAME not in df.columns:
+                print(f"Warning: '{COMMENT_COLUMN_NAME}' not in {f}. Skipping this file.") # Warn if column not found
+                continue
+            all_dfs.append(df) # Append dataframe to list
+        except Exception as e:
+            print(f"Error reading {f}: {e}")
+
+    # Check if any dataframes were read
+    if not all_dfs:
+        print("Error: No valid data could be read. Please check your CSV files and column name.")
+        sys.exit(1)
+
+    # Combine all dataframes into one
+    df_combined = pd.concat(all_dfs, ignore_index=True)
+
+    print(f"Total raw comments found: {len(df_combined)}")
+
+    # Clean the text
+    with profiler.step('clean', rows=len(df_combined)):
+        df_combined['cleaned_text'] = clean_series_parallel(df_combined[COMMENT_COLUMN_NAME], N_PROCESS)
+
+    if not KEEP_ORIGINAL_COLUMNS:
+        df_combined = df_combined[[COMMENT_COLUMN_NAME, 'cleaned_text']]
+
+    # Save to a new, clean file
+    with profiler.step('write'):
+        write_table(df_combined, intermediate_path(output_file))
+    return len(df_combined)
+
+
+# --- Streaming mode helpers ---
+def load_checkpoint():
+    """
+    Returns the saved streaming progress, or None when there is nothing to resume.
+    The checkpoint is only used if the output and every input it counted rows of still
+    start with the bytes they had then: an output rewritten by a non-streaming run or an
+    input overwritten with other comments starts the streaming run over.
+    """
+    if not os.path.exists(CHECKPOINT_FILE) or not os.path.exists(output_file):
+        return None
+    with open(CHECKPOINT_FILE, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    if state.get('output_file') != output_file or 'output_fingerprint' not in state:
+        return None
+    if not prefix_unchanged(output_file, state['output_bytes'], state['output_fingerprint']):
+        print(f"'{output_file}' changed since the last checkpoint. Starting over.")
+        return None
+    for f, progress in state['files'].items():
+        if not prefix_unchanged(f, progress['bytes'], progress['fingerprint']):
+            print(f"'{f}' changed since the last checkpoint. Starting over.")
+            return None
+    return state
+
+
+def save_checkpoint(state):
+    # Write to a temporary file first so an interrupted run never leaves a broken checkpoint
+    tmp_file = CHECKPOINT_FILE + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_file, CHECKPOINT_FILE)
+
+
+def clean_streaming(profiler):
+    """
+    Cleans the raw files chunk by chunk, appending to the output and checkpointing after every chunk.
+    Every file stays a separate stream, so only CHUNK_SIZE rows are in memory at any time.
+    """
+    # Only the comment and its cleaned version are written, so files with different columns can share one output
+    output_columns = [COMMENT_COLUMN_NAME, 'cleaned_text']
+
+    state = load_checkpoint()
+    if state is None:
+        pd.DataFrame(columns=output_columns).to_csv(output_file, index=False)
+        output_bytes = os.path.getsize(output_file)
+        state = {'output_file': output_file, 'output_bytes': output_bytes,
+                 'output_fingerprint': prefix_fingerprint(output_file, output_bytes), 'files': {}}
+        save_checkpoint(state)
+    else:
+        # Drop anything written after the last checkpoint (e.g. a chunk cut short by a crash)
+        with open(output_file, 'r+b') as f:
+            f.truncate(state['output_bytes'])
+        print(f"Resuming from '{CHECKPOINT_FILE}'.")
+
+    total = 0
+    for f in sorted(input_files):
+        rows_done = state['files'].get(f, {}).get('rows', 0)
+        row_start = 0
+        try:
+            # Fingerprint the file as it is before reading, so a later run can tell appends from rewrites
+            input_bytes = os.path.getsize(f)
+            input_fingerprint = prefix_fingerprint(f, input_bytes)
+            for chunk in profiler.iterate('read', pd.read_csv(f, chunksize=CHUNK_SIZE)):
+                if COMMENT_COLUMN_NAME not in chunk.columns:
+                    print(f"Warning: '{COMMENT_COLUMN_NAME}' not in {f}. Skipping this file.") # Warn if column not found
+                    break
+
+                # Skip the rows a previous run already cleaned
+                row_end = row_start + len(chunk)
+                if row_end <= rows_done:
+                    row_start = row_end
+                    continue
+                chunk = chunk.iloc[max(rows_done - row_start, 0):]
+                row_start = row_end
+
+                chunk = chunk[[COMMENT_COLUMN_NAME]].copy()
+                with profiler.step('clean', rows=len(chunk)):
+                    chunk['cleaned_text'] = clean_series_parallel(chunk[COMMENT_COLUMN_NAME], N_PROCESS)
+                with profiler.step('write'):
+                    chunk.to_csv(output_file, mode='a', header=False, index=False)
+
+                rows_done = row_end
+                total += len(chunk)
+                state['files'][f] = {'rows': rows_done, 'bytes': input_bytes, 'fingerprint': input_fingerprint}
+                state['output_bytes'] = os.path.getsize(output_file)
+                state['output_fingerprint'] = prefix_fingerprint(output_file, state['output_bytes'])
+                save_checkpoint(state)
+        except Exception as e:
+            print(f"Error reading {f}: {e}")
             continue
-        all_dfs.append(df) # Append dataframe to list
-    except Exception as e:
-        print(f"Error reading {f}: {e}")
+        print(f"{f}: {rows_done} rows cleaned.")
 
-# Check if any dataframes were read
-if not all_dfs:
-    print("Error: No valid data could be read. Please check your CSV files and column name.")
-    sys.exit(1)
+    return total
 
-# Combine all dataframes into one
-df_combined = pd.concat(all_dfs, ignore_index=True)
 
-print(f"Total raw comments found: {len(df_combined)}")
+# --- Main execution ---
+if __name__ == "__main__":
+    if not input_files:
+        # If no files found, inform the user and exit
+        print("Error: No CSV files found in the 'raw_data' folder.")
+        print("Please create a folder named 'raw_data' and put your CSVs in it.")
+        sys.exit(1)
 
-# Clean the text
-df_combined['cleaned_text'] = df_combined[COMMENT_COLUMN_NAME].astype(str).apply(clean_text)
+    print(f"Found {len(input_files)} files to combine and clean.")
 
-# Save to a new, clean file
-df_combined.to_csv(output_file, index=False)
+    profiler = StageProfiler('clean_data').start()
+    if STREAMING:
+        processed = clean_streaming(profiler)
+    else:
+        processed = clean_all(profiler)
 
-print(f"\nStep 1 Complete: All comments combined and cleaned.")
-print(f"New file created: '{output_file}'")
-print(f"Total comments processed: {len(df_combined)}")
\ No newline at end of file
+    print(f"\nStep 1 Complete: All comments combined and cleaned.")
+    print(f"New file created: '{output_file if STREAMING else intermediate_path(output_file)}'")
+    print(f"Total comments processed: {processed}")
+    profiler.finish(rows=processed)
@@ -0,0 +1,60 @@
+# Convert ASGCN .graph/.tree pickles to the compact .npz adjacency format and compare the two
+# Usage: python convert_graphs_to_npz.py [file.raw.graph ...]   (defaults to every .graph/.tree under datasets/)
+# Import necessary libraries
+import glob
+import os
+import pickle
+import sys
+import time
+import numpy as np
+from adjacency_store import save_adjacency, AdjacencyStore
+
+# --- Configuration ---
+PICKLE_GLOBS = ['datasets/*/*.graph', 'datasets/*/*.tree']
+# ---------------------
+
+def convert(pickle_file):
+    """
+    Writes <pickle_file>.npz, checks it round-trips, and prints a size/load-time comparison.
+    """
+    start = time.perf_counter()
+    with open(pickle_file, 'rb') as f:
+        idx2matrix = pickle.load(f)
+    pickle_load_time = time.perf_counter() - start
+
+    npz_file = pickle_file + '.npz'
+    save_adjacency(idx2matrix, npz_file)
+
+    # Time opening the compact file and rebuilding a single example, which is all a lookup costs
+    start = time.perf_counter()
+    store = AdjacencyStore(npz_file)
+    first_key = next(iter(store))
+    store[first_key]
+    npz_open_time = time.perf_counter() - start
+
+    # Make sure nothing was lost
+    for key, matrix in idx2matrix.items():
+        if not np.array_equal(store[key], matrix):
+            print(f"Error: Example {key} of '{pickle_file}' did not round-trip.")
+            sys.exit(1)
+
+    pickle_size = os.path.getsize(pickle_file)
+    npz_size = os.path.getsize(npz_file)
+    print(f"{pickle_file}: {len(idx2matrix)} examples")
+    print(f"  pickle {pickle_size / 1024:>10.1f} KB  full load   {pickle_load_time * 1000:>8.2f} ms")
+    print(f"  npz    {npz_size / 1024:>10.1f} KB  open + one  {npz_open_time * 1000:>8.2f} ms"
+          f"  ({pickle_size / npz_size:.1f}x smaller)")
+
+
+if __name__ == "__main__":
+    pickle_files = sys.argv[1:] or sorted(f for pattern in PICKLE_GLOBS for f in glob.glob(pattern))
+    if not pickle_files:
+        print("Error: No .graph/.tree files given or found under 'datasets/'.")
+        sys.exit(1)
+
+    for pickle_file in pickle_files:
+        if not os.path.exists(pickle_file):
+            print(f"Error: Input file '{pickle_file}' not found.") # Inform the user if an input file is missing
+            sys.exit(1)
+        convert(pickle_file)
+    print("Done.")
@@ -1,75 +1,146 @@
 # Convert XML-formatted data to 3-line .raw format for ASGCN
+# Works on MAMS and the SemEval aspect-term sets (rest14/lap14 <aspectTerm> and rest15/rest16 <Opinion>)
+# Usage: python convert_mams_to_raw.py [file.xml ...]   (defaults to MAMS_train.xml and MAMS_test.xml)
 # Import necessary libraries
 import xml.etree.ElementTree as ET # for XML parsing
+import multiprocessing
+import os
 import sys
+from instrumentation import StageProfiler
+
+# --- Configuration ---
+DEFAULT_INPUTS = ["MAMS_train.xml", "MAMS_test.xml"]
+N_PROCESS = 4 # Input files converted at the same time
+# ---------------------
+
+# Polarity mapping
+polarity_map = {
+    'positive': 1,
+    'neutral': 0,
+    'negative': -1
+}
+
+
+def aspect_terms(sentence_elem):
+    """
+    Yields (term, polarity, from, to) for every aspect term of a <sentence>, in either XML flavour.
+    """
+    # SemEval-2014 and MAMS: <aspectTerms><aspectTerm term= polarity= from= to=/></aspectTerms>
+    aspect_terms_elem = sentence_elem.find('aspectTerms')
+    if aspect_terms_elem is not None:
+        for aspect_term_elem in aspect_terms_elem.findall('aspectTerm'):
+            yield (aspect_term_elem.get('term'), aspect_term_elem.get('polarity'),
+                   aspect_term_elem.get('from'), aspect_term_elem.get('to'))
+
+    # SemEval-2015/2016: <Opinions><Opinion target= category= polarity= from= to=/></Opinions>
+    opinions_elem = sentence_elem.find('Opinions')
+    if opinions_elem is not None:
+        seen = set()
+        for opinion_elem in opinions_elem.findall('Opinion'):
+            term = opinion_elem.get('target')
+            # Opinions without an explicit target have no span in the sentence
+            if term is None or term == 'NULL':
+                continue
+            key = (term, opinion_elem.get('polarity'), opinion_elem.get('from'), opinion_elem.get('to'))
+            # The same target is listed once per aspect category; keep it once
+            if key in seen:
+                continue
+            seen.add(key)
+            yield key
+
 
 def convert_xml(input_file, output_file):
     """
     Converts an XML-formatted file to the 3-line .raw format for ASGCN.
+    The file is streamed with iterparse and every <sentence> is discarded once written,
+    so memory use does not grow with the size of the file.
+    Returns the number of entries written, or None if the file could not be converted.
     """
+    entry_count = 0
+    if not os.path.exists(input_file):
+        print(f"Error: Input file '{input_file}' not found.") # Print file not found error
+        return None
+    # Write to a temporary file so a file that fails half-way does not leave a truncated .raw behind
+    tmp_file = output_file + '.tmp'
     try:
-        # Parse the XML file
-        tree = ET.parse(input_file)
-        root = tree.getroot()
+        f_out = open(tmp_file, 'w', encoding='utf-8')
+    except OSError as e:
+        print(f"Error: Cannot write output file '{output_file}': {e}") # e.g. the output directory does not exist
+        return None
+    try:
+        with f_out:
+            root = None
+            for event, elem in ET.iterparse(input_file, events=('start', 'end')):
+                if root is None:
+                    root = elem
+                if event != 'end' or elem.tag != 'sentence':
+                    continue
+
+                text_elem = elem.find('text')
+                original_text = text_elem.text if text_elem is not None else None # Get the original sentence text
+                if original_text:
+                    for term, polarity_str, start, end in aspect_terms(elem):
+                        # Skip terms with 'conflict' polarity, as done in the paper
+                        if polarity_str == 'conflict' or polarity_str not in polarity_map:
+                            continue
+
+                        # Map polarity string to integer
+                        polarity_int = polarity_map[polarity_str]
+
+                        # The 'from' and 'to' attributes are character offsets
+                        start = int(start)
+                        end = int(end)
+
+                        # Reconstruct the sentence with the $T$ placeholder
+                        # (lowercase the text around it, ASGCN looks for an upper-case $T$)
+                        left_part = original_text[:start].lower()
+                        right_part = original_text[end:].lower()
+                        sentence_with_placeholder = left_part + "$T$" + right_part
+
+                        # Write the 3-line entry to the output file
+                        f_out.write(sentence_with_placeholder.strip() + '\n')
+                        f_out.write(term.lower().strip() + '\n')
+                        f_out.write(str(polarity_int) + '\n')
+                        entry_count += 1
+
+                # Free the sentence (and the reference the root keeps to it) now that it is written
+                elem.clear()
+                root.clear()
     except ET.ParseError as e:
-        print(f"Error parsing XML file: {e}") # Print parsing error
-        sys.exit(1)
-    except FileNotFoundError:
-        print(f"Error: Input file '{input_file}' not found.") # Print file not found error
-        sys.exit(1)
+        print(f"Error parsing XML file '{input_file}': {e}") # Print parsing error
+        os.remove(tmp_file)
+        return None
 
-    # Polarity mapping
-    polarity_map = {
-        'positive': 1,
-        'neutral': 0,
-        'negative': -1
-    }
-    
-    # Open output file for writing
-    entry_count = 0
-    with open(output_file, 'w', encoding='utf-8') as f_out:
-        # Iterate over each sentence in the XML
-        for sentence_elem in root.findall('sentence'):
-            original_text = sentence_elem.find('text').text # Get the original sentence text
-            
-            aspect_terms_elem = sentence_elem.find('aspectTerms') # Get aspect terms element
-            if aspect_terms_elem is None:
-                continue
+    os.replace(tmp_file, output_file)
+    print(f"Processed {entry_count} aspect term entries from '{input_file}' and saved them to '{output_file}'.")
+    return entry_count
 
-            for aspect_term_elem in aspect_terms_elem.findall('aspectTerm'):
-                term = aspect_term_elem.get('term') # Get the aspect term
-                polarity_str = aspect_term_elem.get('polarity') # Get the polarity string
-                
-                # Skip terms with 'conflict' polarity, as done in the paper
-                if polarity_str == 'conflict' or polarity_str not in polarity_map:
-                    continue
-                
-                # Map polarity string to integer
-                polarity_int = polarity_map[polarity_str]
-                
-                # The 'from' and 'to' attributes are character offsets
-                start = int(aspect_term_elem.get('from'))
-                end = int(aspect_term_elem.get('to'))
-                
-                # Reconstruct the sentence with the $T$ placeholder
-                left_part = original_text[:start]
-                right_part = original_text[end:]
-                sentence_with_placeholder = left_part + "$T$" + right_part
-                
-                # Write the 3-line entry to the output file
-                f_out.write(sentence_with_placeholder.lower().strip() + '\n')
-                f_out.write(term.lower().strip() + '\n')
-                f_out.write(str(polarity_int) + '\n')
-                entry_count += 1
 
-    print(f"Conversion complete.")
-    print(f"Processed {entry_count} aspect term entries and saved them to '{output_file}'.")
+def _convert_one(input_filename):
+    output_filename = os.path.splitext(input_filename)[0] + ".raw"
+    return convert_xml(input_filename, output_filename)
+
 
 if __name__ == "__main__":
-    # Define input and output filenames
-    inputs = ["train", "test"]
-    # Process each dataset
-    for dataset in inputs:
-            input_filename = f"MAMS_{dataset}.xml"
-            output_filename = f"MAMS_{dataset}.raw"
-            convert_xml(input_filename, output_filename)
\ No newline at end of file
+    # Define input filenames (the .raw file is written next to each one)
+    inputs = sys.argv[1:] or DEFAULT_INPUTS
+
+    # Process the datasets in parallel, one file per process
+    # (reading, parsing and writing are interleaved while streaming, so they are timed as one step)
+    profiler = StageProfiler('convert_mams_to_raw').start()
+    n_process = max(1, min(N_PROCESS, len(inputs)))
+    with profiler.step('convert'):
+        if n_process == 1:
+            counts = [_convert_one(f) for f in inputs]
+        else:
+            pool = multiprocessing.Pool(n_process)
+            try:
+                counts = pool.map(_convert_one, inputs)
+            finally:
+                pool.close()
+                pool.join()
+
+    if any(count is None for count in counts):
+        sys.exit(1)
+    print(f"Conversion complete.")
+    profiler.finish(rows=sum(counts))
@@ -0,0 +1,191 @@
+# Remove near-duplicate comments or sentences before they are parsed and sent to annotators
+# Usage: python dedup_near_duplicates.py [input_file [text_column]]
+#   python dedup_near_duplicates.py all_comments_cleaned.csv cleaned_text     (after Step 1)
+#   python dedup_near_duplicates.py all_comments_sentences.csv sentence_text  (after Step 2)
+# Writes <input>_dedup.<ext> (pass it to the next step on the command line) and
+# <input>_duplicates.csv listing every dropped row and the row it duplicates.
+#
+# Each text is reduced to a MinHash signature of its word shingles. Signatures are split into
+# bands, and texts that share a band are candidates; only candidates are compared, so the
+# cost grows with the number of texts, not with the number of pairs. Candidates whose
+# estimated Jaccard similarity reaches THRESHOLD are merged into clusters (union-find), and
+# only the first row of each cluster is kept.
+# Import necessary libraries
+import os
+import sys
+import zlib
+import numpy as np
+import pandas as pd
+from instrumentation import StageProfiler
+from table_io import existing_table, iter_table, write_table
+
+# --- Configuration ---
+INPUT_FILE = 'all_comments_cleaned.csv' # Used when no file is given on the command line
+TEXT_COLUMN = 'cleaned_text'
+THRESHOLD = 0.8      # Estimated Jaccard similarity at which two texts count as duplicates
+SHINGLE_SIZE = 3     # Words per shingle (shorter texts are one shingle)
+NUM_PERM = 128       # MinHash functions per signature
+BATCH_SIZE = 2000    # Texts hashed per numpy batch
+SEED = 8240
+# ---------------------
+
+_MASK16 = np.uint64(0xFFFF)
+
+
+def shingles(text):
+    """
+    32-bit hashes of the word n-grams of a text.
+    """
+    words = text.lower().split()
+    if len(words) <= SHINGLE_SIZE:
+        return [zlib.crc32(' '.join(words).encode('utf-8'))]
+    return list({zlib.crc32(' '.join(words[i:i + SHINGLE_SIZE]).encode('utf-8'))
+                 for i in range(len(words) - SHINGLE_SIZE + 1)})
+
+
+def lsh_params(threshold, num_perm):
+    """
+    Picks (bands, rows) with bands * rows == num_perm. Two texts with Jaccard similarity s share
+    at least one band with probability 1 - (1 - s^rows)^bands, an S-curve that rises around
+    (1 / bands)^(1 / rows). The largest rows keeping that point at or below the threshold is
+    used, so true duplicates are rarely missed and the candidates stay few.
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        if (1.0 / bands) ** (1.0 / rows) <= threshold:
+            best = (bands, rows)
+    return best
+
+
+class MinHasher(object):
+    """
+    Computes MinHash signatures for batches of texts with multiply-shift hash functions,
+    (a * x + b) >> 32 in wrapping 64-bit arithmetic, one column per function.
+    """
+    def __init__(self, num_perm, bands, seed):
+        rng = np.random.RandomState(seed)
+        self.a = (rng.randint(0, 2 ** 32, size=num_perm, dtype=np.uint64) << np.uint64(32)) \
+            | rng.randint(0, 2 ** 32, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = (rng.randint(0, 2 ** 32, size=num_perm, dtype=np.uint64) << np.uint64(32)) \
+            | rng.randint(0, 2 ** 32, size=num_perm, dtype=np.uint64)
+        self.bands = bands
+        self.rows = num_perm // bands
+        # Odd multipliers that fold the rows of a band into one 64-bit key
+        self.band_mix = rng.randint(0, 2 ** 32, size=self.rows, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+
+    def signatures(self, texts):
+        """
+        Returns (signatures [n, num_perm], band keys as uint64 [n, bands]).
+        The band keys use the full hash values; the signatures kept for comparing candidates are
+        cut to their low 16 bits (b-bit MinHash), which halves the memory per text and makes
+        unrelated values collide only once in 65536.
+        """
+        hashed = [shingles(text) for text in texts]
+        lengths = np.array([len(h) for h in hashed], dtype=np.int64)
+        values = np.fromiter((v for h in hashed for v in h), dtype=np.uint64, count=int(lengths.sum()))
+        starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+
+        with np.errstate(over='ignore'):
+            permuted = (values[:, None] * self.a[None, :] + self.b[None, :]) >> np.uint64(32)
+            signatures = np.minimum.reduceat(permuted, starts, axis=0)
+            bands = signatures.reshape(len(texts), self.bands, self.rows) * self.band_mix[None, None, :]
+        keys = np.bitwise_xor.reduce(bands, axis=2)
+        return (signatures & _MASK16).astype(np.uint16), keys
+
+
+def find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]] # Path halving
+        i = parent[i]
+    return i
+
+
+def cluster(signatures, keys, threshold):
+    """
+    Groups texts that share a band and whose signatures agree on at least `threshold` of their
+    positions. Returns an array giving, for every row, the first row of its cluster.
+    """
+    n = len(signatures)
+    parent = np.arange(n)
+    for band in range(keys.shape[1]):
+        # Sorting the band keys puts colliding texts next to each other
+        order = np.argsort(keys[:, band], kind='stable')
+        sorted_keys = keys[order, band]
+        run_start = np.concatenate([[True], sorted_keys[1:] != sorted_keys[:-1]])
+        first = order[np.maximum.accumulate(np.where(run_start, np.arange(n), 0))]
+        candidates = np.nonzero(~run_start)[0]
+        if len(candidates) == 0:
+            continue
+        # Compare each candidate with the first text of its run
+        a = first[candidates]
+        b = order[candidates]
+        similar = (signatures[a] == signatures[b]).mean(axis=1) >= threshold
+        for i, j in zip(a[similar], b[similar]):
+            root_i, root_j = find(parent, i), find(parent, j)
+            # The earlier row stays the cluster's representative
+            if root_i < root_j:
+                parent[root_j] = root_i
+            elif root_j < root_i:
+                parent[root_i] = root_j
+    return np.array([find(parent, i) for i in range(n)], dtype=np.int64)
+
+
+if __name__ == "__main__":
+    input_file = sys.argv[1] if len(sys.argv) > 1 else existing_table(INPUT_FILE)
+    text_column = sys.argv[2] if len(sys.argv) > 2 else TEXT_COLUMN
+    if not os.path.exists(input_file):
+        print(f"Error: Input file '{input_file}' not found.") # Inform the user if the input file is missing
+        sys.exit(1)
+    base, ext = os.path.splitext(input_file)
+    output_file = base + '_dedup' + ext
+    duplicates_file = base + '_duplicates.csv'
+
+    bands, rows = lsh_params(THRESHOLD, NUM_PERM)
+    hasher = MinHasher(NUM_PERM, bands, SEED)
+    print(f"Near-duplicate detection at Jaccard >= {THRESHOLD} ({bands} bands x {rows} rows)...")
+
+    # Pass 1: signatures and band keys, one batch at a time (only the text column is read)
+    profiler = StageProfiler('dedup_near_duplicates').start()
+    signatures, keys = [], []
+    for chunk in profiler.iterate('read', iter_table(input_file, columns=[text_column])):
+        texts = chunk[text_column].fillna('').astype(str).tolist()
+        with profiler.step('minhash', rows=len(texts)):
+            for start in range(0, len(texts), BATCH_SIZE):
+                batch_signatures, batch_keys = hasher.signatures(texts[start:start + BATCH_SIZE])
+                signatures.append(batch_signatures)
+                keys.append(batch_keys)
+    if not signatures:
+        print(f"Error: '{input_file}' has no rows.")
+        sys.exit(1)
+    signatures = np.concatenate(signatures)
+    keys = np.concatenate(keys)
+
+    with profiler.step('lsh'):
+        roots = cluster(signatures, keys, THRESHOLD)
+    keep = roots == np.arange(len(roots))
+    # Estimated similarity of every dropped row to the row it is replaced by
+    similarity = np.ones(len(roots))
+    similarity[~keep] = (signatures[~keep] == signatures[roots[~keep]]).mean(axis=1)
+
+    # Pass 2: write the kept rows (all columns) and the list of dropped ones
+    kept_chunks = []
+    dropped = []
+    row_start = 0
+    for chunk in profiler.iterate('read', iter_table(input_file)):
+        rows_in_chunk = np.arange(row_start, row_start + len(chunk))
+        kept_chunks.append(chunk[keep[rows_in_chunk]])
+        for row, text in zip(rows_in_chunk[~keep[rows_in_chunk]], chunk.loc[~keep[rows_in_chunk], text_column]):
+            dropped.append({'row': int(row), 'duplicate_of': int(roots[row]),
+                            'estimated_similarity': round(float(similarity[row]), 3), text_column: text})
+        row_start += len(chunk)
+    with profiler.step('write'):
+        write_table(pd.concat(kept_chunks, ignore_index=True), output_file)
+        pd.DataFrame(dropped, columns=['row', 'duplicate_of', 'estimated_similarity', text_column]).to_csv(duplicates_file, index=False)
+
+    print(f"Kept {int(keep.sum())} of {len(keep)} rows; dropped {len(dropped)} near-duplicates "
+          f"in {len(set(int(roots[r['row']]) for r in dropped))} clusters.")
+    print(f"New files created: '{output_file}', '{duplicates_file}'")
+    profiler.finish(rows=len(keep))
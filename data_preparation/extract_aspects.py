@@ -1,56 +1,77 @@
 # Step 3: Extract Aspect Term Candidates from Sentences
+# Usage: python extract_aspects.py [input_file]   (e.g. all_comments_sentences_dedup.csv from dedup_near_duplicates.py)
 # Import necessary libraries
 import pandas as pd
-import spacy
 import sys
+from spacy_pipeline import process_texts, NOUN_CHUNK_DISABLE
+from instrumentation import StageProfiler
+from table_io import existing_table, read_table
 
 # --- Configuration ---
 INPUT_CSV = 'all_comments_sentences.csv' # The output from Step 2
 OUTPUT_CSV = 'annotation_tasks.csv'      # The final file for annotation
-TEXT_COLUMN = 'sentence_text'            
+TEXT_COLUMN = 'sentence_text'
+BATCH_SIZE = 1000 # Sentences per nlp.pipe batch
+N_PROCESS = 1     # Worker processes for spaCy (set higher for large corpora)
 # ---------------------
 
-try:
-    df = pd.read_csv(INPUT_CSV)
-except FileNotFoundError:
-    print(f"Error: Input file '{INPUT_CSV}' not found.") # Inform the user if the input file is missing
-    sys.exit(1)
+def keep_aspect(aspect):
+    """
+    Filter: ignore pronouns and very short terms.
+    """
+    return len(aspect) > 2 and aspect not in ['he', 'she', 'it', 'they', 'i', 'you', 'we']
 
-try:
-    # Load spaCy English model
-    nlp = spacy.load("en_core_web_sm")
-except IOError:
-    print("Error: spaCy model 'en_core_web_sm' not found.") # Inform the user if the spaCy model is missing
-    sys.exit(1)
 
-tasks = []
-
-print("Extracting aspect term candidates (noun chunks) from sentences...")
-
-# Process each single sentence
-for text in df[TEXT_COLUMN].astype(str):
-    doc = nlp(text)
-    
+def aspect_candidates(doc):
+    """
+    Returns the noun chunks of a parsed sentence that are worth annotating as aspect terms.
+    """
+    aspects = []
     # Extract all noun chunks as potential aspect terms
     for chunk in doc.noun_chunks:
         aspect = chunk.text.lower().strip()
-        
-        # Filter: ignore pronouns and very short terms
-        if len(aspect) > 2 and aspect not in ['he', 'she', 'it', 'they', 'i', 'you', 'we']:
+        if keep_aspect(aspect):
+            aspects.append(aspect)
+    return aspects
+
+
+if __name__ == "__main__":
+    profiler = StageProfiler('extract_aspects').start()
+    input_file = sys.argv[1] if len(sys.argv) > 1 else existing_table(INPUT_CSV)
+    try:
+        # Only the text column is read (with Parquet, the other columns are never decoded)
+        with profiler.step('read'):
+            df = read_table(input_file, columns=[TEXT_COLUMN])
+    except FileNotFoundError:
+        print(f"Error: Input file '{input_file}' not found.") # Inform the user if the input file is missing
+        sys.exit(1)
+
+    tasks = []
+
+    print("Extracting aspect term candidates (noun chunks) from sentences...")
+
+    # Process the sentences in batches (named entities are not needed for noun chunks)
+    sentences = df[TEXT_COLUMN].astype(str)
+    results = process_texts(sentences, aspect_candidates, disable=NOUN_CHUNK_DISABLE,
+                            batch_size=BATCH_SIZE, n_process=N_PROCESS)
+    for text, aspects in zip(sentences, profiler.iterate('parse', results)):
+        for aspect in aspects:
             tasks.append({'sentence': text, 'aspect_term': aspect})
 
-# Create a new DataFrame with the tasks
-df_tasks = pd.DataFrame(tasks)
+    # Create a new DataFrame with the tasks
+    df_tasks = pd.DataFrame(tasks)
 
-# Remove duplicate sentence/aspect pairs
-df_tasks.drop_duplicates(inplace=True)
+    # Remove duplicate sentence/aspect pairs
+    df_tasks.drop_duplicates(inplace=True)
 
-# Shuffle the data randomly
-print(f"Found {len(df_tasks)} tasks. Shuffling them randomly...")
-df_tasks = df_tasks.sample(frac=1).reset_index(drop=True)
+    # Shuffle the data randomly
+    print(f"Found {len(df_tasks)} tasks. Shuffling them randomly...")
+    df_tasks = df_tasks.sample(frac=1).reset_index(drop=True)
 
-# Save to a new CSV
-df_tasks.to_csv(OUTPUT_CSV, index=False)
+    # Save to a new CSV
+    with profiler.step('write'):
+        df_tasks.to_csv(OUTPUT_CSV, index=False)
 
-print(f"\nStep 3 Complete: Extracted and shuffled {len(df_tasks)} aspect tasks.")
-print(f"New file created: '{OUTPUT_CSV}'")
\ No newline at end of file
+    print(f"\nStep 3 Complete: Extracted and shuffled {len(df_tasks)} aspect tasks.")
+    print(f"New file created: '{OUTPUT_CSV}'")
+    profiler.finish(rows=len(df))
@@ -0,0 +1,44 @@
+# Content hashes of files, remembered by modification time and size
+# Shared by pipeline.py (stage fingerprints) and validate_datasets.py (summary cache keys).
+# prefix_fingerprint() recognizes a file that was only appended to since it was last read,
+# for clean_data.py's streaming checkpoint and adjudicate.py's incremental mode.
+# Import necessary libraries
+import hashlib
+import os
+
+
+def file_digest(path, memo):
+    """
+    SHA-256 of a file. memo maps path -> [mtime_ns, size, digest] so unchanged files are not re-read.
+    """
+    stat = os.stat(path)
+    seen = memo.get(path)
+    if seen is not None and seen[0] == stat.st_mtime_ns and seen[1] == stat.st_size:
+        return seen[2]
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    memo[path] = [stat.st_mtime_ns, stat.st_size, h.hexdigest()]
+    return memo[path][2]
+
+
+def prefix_fingerprint(path, size, block=1 << 16):
+    """
+    Hash of the first and the last block bytes of the first size bytes of a file.
+    Appending to the file keeps it; rewriting or replacing the file almost always changes it.
+    """
+    h = hashlib.sha256(str(size).encode('ascii'))
+    with open(path, 'rb') as f:
+        h.update(f.read(min(size, block)))
+        tail_start = max(size - block, 0)
+        f.seek(tail_start)
+        h.update(f.read(size - tail_start))
+    return h.hexdigest()
+
+
+def prefix_unchanged(path, size, fingerprint):
+    """
+    True if the file still starts with the size bytes it had when fingerprinted.
+    """
+    return os.path.exists(path) and os.path.getsize(path) >= size and prefix_fingerprint(path, size) == fingerprint
@@ -0,0 +1,176 @@
+# Generate synthetic Reddit-style comments, annotator files and MAMS-style XML for benchmarking
+# Usage: python generate_synthetic_data.py N_ROWS [output_dir]
+# Everything is seeded, so the same size always gives the same files, and rows are written in
+# blocks so memory stays flat up to 10M rows and more.
+# Import necessary libraries
+import csv
+import os
+import random
+import sys
+from xml.sax.saxutils import escape, quoteattr
+
+# --- Configuration ---
+SEED = 8240
+N_FILES = 8             # Raw comment files, like the eight topic/polarity files in raw_data/
+XML_RATIO = 0.1         # MAMS sentences per comment row
+ANNOTATION_RATIO = 0.1  # Annotated (sentence, aspect) rows per comment row
+N_ANNOTATORS = 2
+DISAGREEMENT_RATE = 0.2 # Chance that an annotator's label differs from the first annotator's
+BLOCK_SIZE = 10000      # Rows written per block
+# ---------------------
+
+# Word lists for the templates (a mix of the four scraped topics)
+ASPECTS = ['battery', 'screen', 'keyboard', 'camera', 'customer service', 'delivery', 'warranty',
+           'price', 'food', 'waiter', 'staff', 'menu', 'coffee', 'fit', 'fabric', 'size chart',
+           'return policy', 'trackpad', 'speakers', 'charger', 'pixel software', 'build quality',
+           'manager', 'portion size', 'wait time', 'stitching', 'customer support', 'display']
+BRANDS = ['Lenovo', 'ASUS', 'Apple', 'Samsung', 'Google', 'Dell', 'Zara', 'Uniqlo', 'H&M', 'Walmart']
+POSITIVE = ['great', 'amazing', 'solid', 'excellent', 'really good', 'fantastic', 'decent', 'perfect']
+NEGATIVE = ['terrible', 'awful', 'broken', 'disappointing', 'garbage', 'slow', 'overpriced', 'rude']
+NEUTRAL = ['okay', 'fine', 'average', 'standard', 'what you expect', 'alright']
+TEMPLATES = [
+    "The {aspect} is {opinion}.",
+    "Honestly the {aspect} on my {brand} was {opinion}, but the {aspect2} is {opinion2}.",
+    "I've had my {brand} for {n} months and the {aspect} has been {opinion}",
+    "{brand}. Got one last year, {aspect} was {opinion}. Never again.",
+    "Can't complain about the {aspect}, it's {opinion}!",
+    "Anyone else think the {aspect} is {opinion}? The {aspect2} seems {opinion2} to me",
+    "Went there twice. First time the {aspect} was {opinion}.\nSecond time the {aspect2} was {opinion2}.",
+]
+# Reddit noise the cleaning step has to deal with
+NOISE = ['', '', '', '', ' https://www.example.com/thread/{n}', ' (see u/user{n})', ' r/BuyItForLife',
+         ' ðŸ¥²', ' â€™', ' lol', ' 🙂', '   ', ' www.example.org', ' #NAME?']
+SPECIAL = ['[deleted]', '[removed]']
+POLARITIES = ['Positive', 'Negative', 'Neutral']
+
+
+def _opinion(rng):
+    polarity = rng.choice(POLARITIES)
+    words = POSITIVE if polarity == 'Positive' else NEGATIVE if polarity == 'Negative' else NEUTRAL
+    return rng.choice(words), polarity
+
+
+def make_comment(rng):
+    """
+    Returns one Reddit-style comment with the kind of noise clean_data.py removes.
+    """
+    if rng.random() < 0.02:
+        return rng.choice(SPECIAL)
+    sentences = []
+    for _ in range(rng.randint(1, 3)):
+        opinion, _ = _opinion(rng)
+        opinion2, _ = _opinion(rng)
+        sentences.append(rng.choice(TEMPLATES).format(
+            aspect=rng.choice(ASPECTS), aspect2=rng.choice(ASPECTS), brand=rng.choice(BRANDS),
+            opinion=opinion, opinion2=opinion2, n=rng.randint(1, 36)))
+    text = ' '.join(sentences) + rng.choice(NOISE).format(n=rng.randint(1, 99999))
+    return text if rng.random() > 0.3 else text.lower()
+
+
+def write_comments(n_rows, output_dir):
+    """
+    Writes n_rows comments spread over N_FILES files in <output_dir>/raw_data/, with the
+    columns scrape_reddit_concurrent.py writes.
+    """
+    rng = random.Random(SEED)
+    raw_dir = os.path.join(output_dir, 'raw_data')
+    if not os.path.exists(raw_dir):
+        os.makedirs(raw_dir)
+    rows_per_file = [n_rows // N_FILES + (1 if i < n_rows % N_FILES else 0) for i in range(N_FILES)]
+    comment_id = 0
+    for i, n in enumerate(rows_per_file):
+        with open(os.path.join(raw_dir, f'synthetic_{i}_raw.csv'), 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(['comment_id', 'created_utc', 'comment_text'])
+            for start in range(0, n, BLOCK_SIZE):
+                block = []
+                for _ in range(min(BLOCK_SIZE, n - start)):
+                    comment_id += 1
+                    block.append([f'c{comment_id:x}', 1600000000 + comment_id, make_comment(rng)])
+                writer.writerows(block)
+
+
+def write_annotations(n_rows, output_dir):
+    """
+    Writes N_ANNOTATORS annotator files over the same n_rows (sentence, aspect_term) pairs,
+    with DISAGREEMENT_RATE of the labels changed after the first annotator.
+    """
+    rng = random.Random(SEED + 1)
+    files = [open(os.path.join(output_dir, f'annotator_{a + 1}.csv'), 'w', encoding='utf-8', newline='')
+             for a in range(N_ANNOTATORS)]
+    try:
+        writers = [csv.writer(f, lineterminator='\n') for f in files]
+        for writer in writers:
+            writer.writerow(['sentence', 'aspect_term', 'polarity'])
+        for start in range(0, n_rows, BLOCK_SIZE):
+            blocks = [[] for _ in writers]
+            for i in range(start, min(start + BLOCK_SIZE, n_rows)):
+                aspect = rng.choice(ASPECTS)
+                opinion, polarity = _opinion(rng)
+                # The row number keeps every (sentence, aspect_term) pair unique
+                sentence = f"the {aspect} on this {rng.choice(BRANDS).lower()} is {opinion} ({i})"
+                for a, block in enumerate(blocks):
+                    label = polarity
+                    if a > 0 and rng.random() < DISAGREEMENT_RATE:
+                        label = rng.choice([p for p in POLARITIES if p != polarity])
+                    block.append([sentence, aspect, label])
+            for writer, block in zip(writers, blocks):
+                writer.writerows(block)
+    finally:
+        for f in files:
+            f.close()
+
+
+def write_mams_xml(n_sentences, filename):
+    """
+    Writes n_sentences MAMS-style <sentence> elements, each with two or three <aspectTerm>s
+    that have different polarities, as in MAMS.
+    """
+    rng = random.Random(SEED + 2)
+    polarity_words = {'positive': POSITIVE, 'negative': NEGATIVE, 'neutral': NEUTRAL}
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="utf-8"?>\n<sentences>\n')
+        for start in range(0, n_sentences, BLOCK_SIZE):
+            block = []
+            for i in range(start, min(start + BLOCK_SIZE, n_sentences)):
+                n_terms = rng.randint(2, 3)
+                aspects = rng.sample(ASPECTS, n_terms)
+                polarities = rng.sample(list(polarity_words), n_terms)
+                parts, terms, offset = [], [], 0
+                for aspect, polarity in zip(aspects, polarities):
+                    prefix = 'the ' if not parts else ' but the '
+                    begin = offset + len(prefix)
+                    clause = f"{prefix}{aspect} was {rng.choice(polarity_words[polarity])}"
+                    parts.append(clause)
+                    terms.append((aspect, polarity, begin, begin + len(aspect)))
+                    offset += len(clause)
+                text = ''.join(parts) + '.'
+                lines = [f'  <sentence id="{i}">', f'    <text>{escape(text)}</text>', '    <aspectTerms>']
+                for term, polarity, begin, end in terms:
+                    lines.append(f'      <aspectTerm from="{begin}" polarity="{polarity}" term={quoteattr(term)} to="{end}"/>')
+                lines += ['    </aspectTerms>', '  </sentence>']
+                block.append('\n'.join(lines))
+            f.write('\n'.join(block) + '\n')
+        f.write('</sentences>\n')
+
+
+def generate(n_rows, output_dir):
+    """
+    Generates the full synthetic input set for a benchmark of size n_rows in output_dir.
+    """
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    write_comments(n_rows, output_dir)
+    write_annotations(max(1, int(n_rows * ANNOTATION_RATIO)), output_dir)
+    write_mams_xml(max(1, int(n_rows * XML_RATIO)), os.path.join(output_dir, 'MAMS_train.xml'))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python generate_synthetic_data.py N_ROWS [output_dir]")
+        sys.exit(1)
+    n_rows = int(sys.argv[1])
+    output_dir = sys.argv[2] if len(sys.argv) > 2 else f'synthetic_{n_rows}'
+    generate(n_rows, output_dir)
+    print(f"Generated {n_rows} comments, {max(1, int(n_rows * ANNOTATION_RATIO))} annotated rows x {N_ANNOTATORS} "
+          f"annotators and {max(1, int(n_rows * XML_RATIO))} MAMS sentences in '{output_dir}'.")
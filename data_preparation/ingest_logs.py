@@ -0,0 +1,201 @@
+# Load the experiment logs in log/ into an indexed SQLite results table and summarize them
+# Usage (from the repository root):
+#   python data_preparation/ingest_logs.py                       mean/std/max for every model and dataset
+#   python data_preparation/ingest_logs.py --dataset mams        only the MAMS results
+#   python data_preparation/ingest_logs.py --model asgcn --runs  the individual repeats of one model
+#
+# Log files are named <model>_<dataset>_<split>.txt and hold lines like
+#   repeat: 1max_test_acc: 0.7476, max_test_f1: 0.7047repeat: 2max_test_acc: ...
+# with the records glued together. Every invocation first ingests new or changed log files
+# (compared by modification time and size), so rerunning it after an experiment only parses
+# the files that changed. When a log file holds more than one run (the repeat counter starts
+# over), each run is stored and the summaries use the latest one unless --all-runs is given.
+# Import necessary libraries
+import argparse
+import glob
+import math
+import os
+import re
+import sqlite3
+import sys
+
+# --- Configuration ---
+LOG_GLOB = 'log/*.txt'
+DATABASE_FILE = 'results.sqlite'
+# ---------------------
+
+RECORD = re.compile(r'repeat:\s*(\d+)\s*max_test_acc:\s*([\d.eE+-]+),\s*max_test_f1:\s*([\d.eE+-]+)')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS log_files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    path TEXT NOT NULL,
+    model TEXT NOT NULL,
+    dataset TEXT NOT NULL,
+    split TEXT NOT NULL,
+    run INTEGER NOT NULL,
+    repeat INTEGER NOT NULL,
+    test_acc REAL NOT NULL,
+    test_f1 REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_model_dataset ON results (model, dataset);
+CREATE INDEX IF NOT EXISTS results_dataset ON results (dataset);
+CREATE INDEX IF NOT EXISTS results_path ON results (path, run);
+"""
+
+
+def parse_log_name(path):
+    """
+    Splits <model>_<dataset>_<split>.txt into (model, dataset, split). Returns None for other names.
+    """
+    parts = os.path.splitext(os.path.basename(path))[0].split('_')
+    if len(parts) < 3:
+        return None
+    return parts[0], parts[1], '_'.join(parts[2:])
+
+
+def parse_log(text):
+    """
+    Returns [(run, repeat, test_acc, test_f1), ...] for every record in a log.
+    A new run starts whenever the repeat counter does not go up.
+    """
+    records = []
+    run = 0
+    previous = None
+    for match in RECORD.finditer(text):
+        repeat = int(match.group(1))
+        if previous is not None and repeat <= previous:
+            run += 1
+        previous = repeat
+        records.append((run, repeat, float(match.group(2)), float(match.group(3))))
+    return records
+
+
+def connect(filename):
+    conn = sqlite3.connect(filename)
+    conn.executescript(SCHEMA)
+    # SQLite only has sqrt() when built with the math extension, so provide it for the std queries
+    conn.create_function('sqrt', 1, lambda x: math.sqrt(max(x, 0.0)) if x is not None else None)
+    return conn
+
+
+def ingest(conn, log_files):
+    """
+    Parses the log files that are new or changed since the last ingest and drops the ones that
+    were removed. Returns (files parsed, records stored).
+    """
+    known = {path: (mtime_ns, size) for path, mtime_ns, size in conn.execute('SELECT path, mtime_ns, size FROM log_files')}
+    parsed = 0
+    stored = 0
+    with conn:
+        for path in set(known) - set(log_files):
+            conn.execute('DELETE FROM results WHERE path = ?', (path,))
+            conn.execute('DELETE FROM log_files WHERE path = ?', (path,))
+
+        for path in log_files:
+            stat = os.stat(path)
+            if known.get(path) == (stat.st_mtime_ns, stat.st_size):
+                continue
+            names = parse_log_name(path)
+            if names is None:
+                print(f"Warning: '{path}' is not named <model>_<dataset>_<split>.txt. Skipping it.")
+                continue
+            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                records = parse_log(f.read())
+            if not records:
+                print(f"Warning: No results found in '{path}'.")
+
+            model, dataset, split = names
+            conn.execute('DELETE FROM results WHERE path = ?', (path,))
+            conn.executemany('INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                             [(path, model, dataset, split) + record for record in records])
+            conn.execute('INSERT OR REPLACE INTO log_files VALUES (?, ?, ?)', (path, stat.st_mtime_ns, stat.st_size))
+            parsed += 1
+            stored += len(records)
+    return parsed, stored
+
+
+def query_filters(args):
+    conditions, params = [], []
+    for column in ['model', 'dataset', 'split']:
+        value = getattr(args, column)
+        if value is not None:
+            conditions.append(f'{column} = ?')
+            params.append(value)
+    if not args.all_runs:
+        conditions.append('run = (SELECT MAX(r.run) FROM results r WHERE r.path = results.path)')
+    return (' WHERE ' + ' AND '.join(conditions)) if conditions else '', params
+
+
+def summarize(conn, args):
+    """
+    Mean, sample standard deviation and max of accuracy and F1 per (model, dataset, split).
+    """
+    where, params = query_filters(args)
+    metric = 'test_' + args.sort
+    return conn.execute(f"""
+        SELECT model, dataset, split, COUNT(*) AS n,
+               AVG(test_acc), sqrt((SUM(test_acc * test_acc) - SUM(test_acc) * SUM(test_acc) / COUNT(*)) / (COUNT(*) - 1)), MAX(test_acc),
+               AVG(test_f1), sqrt((SUM(test_f1 * test_f1) - SUM(test_f1) * SUM(test_f1) / COUNT(*)) / (COUNT(*) - 1)), MAX(test_f1)
+        FROM results{where}
+        GROUP BY model, dataset, split
+        ORDER BY dataset, split, AVG({metric}) DESC
+    """, params).fetchall()
+
+
+def print_summary(rows):
+    def fmt(value):
+        return f"{value * 100:6.2f}" if value is not None else '     -'
+
+    print(f"{'dataset':<10} {'model':<8} {'split':<6} {'n':>3}   {'acc mean':>8} {'std':>6} {'max':>6}   {'f1 mean':>8} {'std':>6} {'max':>6}")
+    previous = None
+    for model, dataset, split, n, acc, acc_std, acc_max, f1, f1_std, f1_max in rows:
+        if previous is not None and dataset != previous:
+            print()
+        previous = dataset
+        print(f"{dataset:<10} {model:<8} {split:<6} {n:>3}   {fmt(acc):>8} {fmt(acc_std)} {fmt(acc_max)}   "
+              f"{fmt(f1):>8} {fmt(f1_std)} {fmt(f1_max)}")
+
+
+def print_runs(conn, args):
+    where, params = query_filters(args)
+    rows = conn.execute(f"""
+        SELECT model, dataset, split, run, repeat, test_acc, test_f1 FROM results{where}
+        ORDER BY dataset, model, split, run, repeat
+    """, params).fetchall()
+    print(f"{'dataset':<10} {'model':<8} {'split':<6} {'run':>3} {'repeat':>6} {'acc':>8} {'f1':>8}")
+    for model, dataset, split, run, repeat, acc, f1 in rows:
+        print(f"{dataset:<10} {model:<8} {split:<6} {run:>3} {repeat:>6} {acc * 100:>8.2f} {f1 * 100:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Ingest the experiment logs and summarize the results (accuracy and F1 in %).')
+    parser.add_argument('--logs', default=LOG_GLOB, help=f"glob of the log files (default: {LOG_GLOB})")
+    parser.add_argument('--db', default=DATABASE_FILE, help=f"SQLite results database (default: {DATABASE_FILE})")
+    parser.add_argument('--model', help='only this model (e.g. asgcn)')
+    parser.add_argument('--dataset', help='only this dataset (e.g. mams)')
+    parser.add_argument('--split', help='only this split (e.g. val)')
+    parser.add_argument('--sort', choices=['acc', 'f1'], default='acc', help='order models by mean accuracy or F1')
+    parser.add_argument('--runs', action='store_true', help='list the individual repeats instead of the summary')
+    parser.add_argument('--all-runs', action='store_true', help='include older runs found in the same log file')
+    args = parser.parse_args()
+
+    log_files = sorted(glob.glob(args.logs))
+    if not log_files:
+        print(f"Error: No log files found matching '{args.logs}'.")
+        sys.exit(1)
+
+    conn = connect(args.db)
+    parsed, stored = ingest(conn, log_files)
+    if parsed:
+        print(f"Ingested {stored} results from {parsed} new or changed log files into '{args.db}'.\n")
+
+    if args.runs:
+        print_runs(conn, args)
+    else:
+        print_summary(summarize(conn, args))
+    conn.close()
@@ -0,0 +1,164 @@
+# Shared timing, throughput and memory instrumentation for the data preparation stages
+#
+# Usage in a stage script:
+#   profiler = StageProfiler('clean_data')
+#   profiler.start()
+#   with profiler.step('read'):
+#       ...
+#   profiler.finish(rows=len(df))
+#
+# finish() prints a short summary and appends the run to the reports next to the stage's outputs:
+#   run_report.jsonl  one JSON object per stage run (wall time, rows/s, peak RSS, every step)
+#   run_report.csv    one row per step, for spreadsheets
+# Set DATA_PREP_PROFILE=1 to also dump a cProfile of the stage to <stage>.prof
+# (open it with `python -m pstats <stage>.prof` or snakeviz). Only the main process is profiled.
+# Import necessary libraries
+import contextlib
+import cProfile
+import csv
+import datetime
+import json
+import os
+import sys
+import time
+
+try:
+    import resource # Not available on Windows
+except ImportError:
+    resource = None
+
+# --- Configuration ---
+REPORT_JSON = 'run_report.jsonl'
+REPORT_CSV = 'run_report.csv'
+PROFILE_ENV = 'DATA_PREP_PROFILE' # Set to 1 to write a cProfile dump per stage
+# ---------------------
+
+CSV_COLUMNS = ['started', 'stage', 'step', 'seconds', 'calls', 'rows', 'rows_per_second', 'peak_rss_mb']
+
+
+def peak_rss_mb(who='self'):
+    """
+    Peak resident set size in MB of this process ('self') or of its finished worker processes
+    ('children'), or None where the resource module is unavailable.
+    """
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who == 'self' else resource.RUSAGE_CHILDREN)
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0
+    return round(usage.ru_maxrss / scale, 1)
+
+
+class StageProfiler(object):
+    """
+    Records the wall time of a stage and of its named steps (read, clean, parse, write, ...).
+    A step can be entered many times, e.g. once per chunk; its time, call count and rows add up.
+    """
+    def __init__(self, stage, report_dir='.'):
+        self.stage = stage
+        self.report_dir = report_dir
+        self.steps = {} # name -> {'seconds', 'calls', 'rows'}, in the order first seen
+        self.started = None
+        self.start_time = None
+        self.profile = None
+
+    def start(self):
+        self.started = datetime.datetime.now().isoformat(timespec='seconds')
+        self.start_time = time.perf_counter()
+        if os.environ.get(PROFILE_ENV, '') not in ('', '0'):
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        return self
+
+    @contextlib.contextmanager
+    def step(self, name, rows=None):
+        """
+        Times the enclosed block as step `name`. rows, if given, is added to the step's row count.
+        """
+        entry = self.steps.setdefault(name, {'seconds': 0.0, 'calls': 0, 'rows': 0})
+        start = time.perf_counter()
+        try:
+            yield entry
+        finally:
+            entry['seconds'] += time.perf_counter() - start
+            entry['calls'] += 1
+            if rows is not None:
+                entry['rows'] += rows
+
+    def iterate(self, name, iterable):
+        """
+        Yields the items of iterable, timing the production of each one as step `name`.
+        Useful for chunked readers and nlp.pipe, where the work happens inside the iterator.
+        """
+        iterator = iter(iterable)
+        entry = self.steps.setdefault(name, {'seconds': 0.0, 'calls': 0, 'rows': 0})
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                entry['seconds'] += time.perf_counter() - start
+                return
+            entry['seconds'] += time.perf_counter() - start
+            entry['calls'] += 1
+            yield item
+
+    def finish(self, rows=None, **extra):
+        """
+        Stops the clock, prints a summary and appends the run to the reports. Returns the record.
+        """
+        seconds = time.perf_counter() - self.start_time
+        if self.profile is not None:
+            self.profile.disable()
+            profile_file = os.path.join(self.report_dir, self.stage + '.prof')
+            self.profile.dump_stats(profile_file)
+            extra['profile'] = profile_file
+
+        record = {
+            'started': self.started,
+            'stage': self.stage,
+            'seconds': round(seconds, 4),
+            'rows': rows,
+            'rows_per_second': round(rows / seconds, 1) if rows and seconds > 0 else None,
+            'peak_rss_mb': peak_rss_mb('self'),
+            'peak_rss_children_mb': peak_rss_mb('children'),
+            'steps': {},
+        }
+        for name, entry in self.steps.items():
+            record['steps'][name] = {
+                'seconds': round(entry['seconds'], 4),
+                'calls': entry['calls'],
+                'rows': entry['rows'] or None,
+                'rows_per_second': round(entry['rows'] / entry['seconds'], 1) if entry['rows'] and entry['seconds'] > 0 else None,
+            }
+        record.update(extra)
+
+        self.print_summary(record)
+        self.write_reports(record)
+        return record
+
+    def print_summary(self, record):
+        rate = f", {record['rows_per_second']:.0f} rows/s" if record['rows_per_second'] else ''
+        memory = f", peak RSS {record['peak_rss_mb']} MB" if record['peak_rss_mb'] is not None else ''
+        print(f"[{self.stage}] {record['seconds']:.2f} s{rate}{memory}")
+        for name, entry in record['steps'].items():
+            share = 100.0 * entry['seconds'] / record['seconds'] if record['seconds'] > 0 else 0.0
+            print(f"    {name:<10} {entry['seconds']:>9.3f} s  {share:>5.1f}%")
+
+    def write_reports(self, record):
+        with open(os.path.join(self.report_dir, REPORT_JSON), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+
+        csv_file = os.path.join(self.report_dir, REPORT_CSV)
+        write_header = not os.path.exists(csv_file)
+        with open(csv_file, 'a', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS, lineterminator='\n')
+            if write_header:
+                writer.writeheader()
+            rows = [dict(step='total', seconds=record['seconds'], calls=1, rows=record['rows'],
+                         rows_per_second=record['rows_per_second'], peak_rss_mb=record['peak_rss_mb'])]
+            for name, entry in record['steps'].items():
+                rows.append(dict(step=name, peak_rss_mb=None, **entry))
+            for row in rows:
+                row.update(started=record['started'], stage=record['stage'])
+                writer.writerow(row)
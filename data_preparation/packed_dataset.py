@@ -0,0 +1,160 @@
+# Packed, memory-mappable dataset format for training-time loading
+#
+# A .raw file and its .graph/.tree companions are packed into one directory:
+#
+#   tokens.npy         int32  word indices of every example, back to back
+#   token_offsets.npy  int64  example i's tokens are tokens[token_offsets[i]:token_offsets[i + 1]]
+#   aspect_spans.npy   int32  [start, end) of the aspect term within example i's tokens
+#   polarity.npy       int8   label, shifted to 0/1/2 like ASGCN's data_utils.py
+#   keys.npy           int64  line index of the example in the .raw file
+#   graph.npz/tree.npz        adjacency matrices in the adjacency_store.py format
+#   word2idx.json             the word index the tokens refer to
+#
+# Every array is opened with mmap_mode='r', so opening is O(1) and example i is read on demand.
+# Usage: python packed_dataset.py file.raw [file.raw ...]   (packs each file and compares load times)
+# Import necessary libraries
+import json
+import os
+import pickle
+import sys
+import time
+import numpy as np
+from raw_dataset import read_raw, full_text, build_vocab, text_to_sequence
+from adjacency_store import save_adjacency, load_adjacency, AdjacencyStore
+
+# --- Configuration ---
+VOCAB_FILE = None # Shared word2idx.json to pack against (None builds a vocabulary from the file itself)
+# ---------------------
+
+def pack(raw_file, output_dir, word2idx=None):
+    """
+    Packs raw_file and <raw_file>.graph/.tree (pickles, or .graph.npz/.tree.npz) into output_dir.
+    """
+    if word2idx is None:
+        word2idx = build_vocab([raw_file])
+
+    keys, tokens, offsets, spans, polarities = [], [], [0], [], []
+    for index, text_left, aspect, text_right, polarity in read_raw(raw_file):
+        left = text_to_sequence(text_left, word2idx)
+        aspect_seq = text_to_sequence(aspect, word2idx)
+        text = text_to_sequence(full_text(text_left, aspect, text_right), word2idx)
+        keys.append(index)
+        tokens.extend(text)
+        offsets.append(len(tokens))
+        spans.append((len(left), len(left) + len(aspect_seq)))
+        polarities.append(int(polarity) + 1)
+
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    np.save(os.path.join(output_dir, 'tokens.npy'), np.array(tokens, dtype=np.int32))
+    np.save(os.path.join(output_dir, 'token_offsets.npy'), np.array(offsets, dtype=np.int64))
+    np.save(os.path.join(output_dir, 'aspect_spans.npy'), np.array(spans, dtype=np.int32).reshape(-1, 2))
+    np.save(os.path.join(output_dir, 'polarity.npy'), np.array(polarities, dtype=np.int8))
+    np.save(os.path.join(output_dir, 'keys.npy'), np.array(keys, dtype=np.int64))
+    with open(os.path.join(output_dir, 'word2idx.json'), 'w', encoding='utf-8') as f:
+        json.dump(word2idx, f)
+
+    for kind in ['graph', 'tree']:
+        source = raw_file + '.' + kind
+        if not os.path.exists(source) and os.path.exists(source + '.npz'):
+            source += '.npz'
+        if not os.path.exists(source):
+            print(f"Warning: '{raw_file}.{kind}' not found. The packed dataset will have no {kind}.")
+            continue
+        adjacency = load_adjacency(source)
+        save_adjacency({key: adjacency[key] for key in keys}, os.path.join(output_dir, kind + '.npz'))
+    return len(keys)
+
+
+class PackedDataset(object):
+    """
+    Random-access view of a packed dataset. dataset[i] returns the same fields as ASGCN's ABSADataset
+    (without padding): text_indices, context_indices, aspect_indices, left_indices, polarity and
+    dependency_graph (plus dependency_tree when present).
+    """
+    def __init__(self, path):
+        def load(name):
+            return np.load(os.path.join(path, name), mmap_mode='r')
+        self.tokens = load('tokens.npy')
+        self.token_offsets = load('token_offsets.npy')
+        self.aspect_spans = load('aspect_spans.npy')
+        self.polarity = load('polarity.npy')
+        self.keys = load('keys.npy')
+        self.graph = None
+        self.tree = None
+        if os.path.exists(os.path.join(path, 'graph.npz')):
+            self.graph = AdjacencyStore(os.path.join(path, 'graph.npz'))
+        if os.path.exists(os.path.join(path, 'tree.npz')):
+            self.tree = AdjacencyStore(os.path.join(path, 'tree.npz'))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __getitem__(self, i):
+        text = np.asarray(self.tokens[self.token_offsets[i]:self.token_offsets[i + 1]])
+        start, end = self.aspect_spans[i]
+        item = {
+            'text_indices': text,
+            'context_indices': np.concatenate([text[:start], text[end:]]),
+            'aspect_indices': text[start:end],
+            'left_indices': text[:start],
+            'polarity': int(self.polarity[i]),
+        }
+        key = int(self.keys[i])
+        if self.graph is not None:
+            item['dependency_graph'] = self.graph[key]
+        if self.tree is not None:
+            item['dependency_tree'] = self.tree[key]
+        return item
+
+
+def load_from_text(raw_file):
+    """
+    What a training run does today: tokenize the .raw text and unpickle the whole .graph file.
+    """
+    word2idx = build_vocab([raw_file])
+    with open(raw_file + '.graph', 'rb') as f:
+        idx2graph = pickle.load(f)
+    data = []
+    for index, text_left, aspect, text_right, polarity in read_raw(raw_file):
+        data.append({
+            'text_indices': text_to_sequence(full_text(text_left, aspect, text_right), word2idx),
+            'aspect_indices': text_to_sequence(aspect, word2idx),
+            'left_indices': text_to_sequence(text_left, word2idx),
+            'polarity': int(polarity) + 1,
+            'dependency_graph': idx2graph[index],
+        })
+    return data
+
+
+if __name__ == "__main__":
+    raw_files = sys.argv[1:]
+    if not raw_files:
+        print("Usage: python packed_dataset.py file.raw [file.raw ...]")
+        sys.exit(1)
+
+    word2idx = None
+    if VOCAB_FILE is not None:
+        with open(VOCAB_FILE, 'r', encoding='utf-8') as f:
+            word2idx = json.load(f)
+
+    for raw_file in raw_files:
+        if not os.path.exists(raw_file):
+            print(f"Error: Input file '{raw_file}' not found.") # Inform the user if an input file is missing
+            sys.exit(1)
+        output_dir = raw_file + '.packed'
+        count = pack(raw_file, output_dir, word2idx)
+        print(f"Packed {count} examples from '{raw_file}' into '{output_dir}'.")
+
+        # Cold-start comparison: everything a training run needs before its first batch
+        if os.path.exists(raw_file + '.graph'):
+            start = time.perf_counter()
+            load_from_text(raw_file)
+            text_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            dataset = PackedDataset(output_dir)
+            dataset[len(dataset) // 2]
+            packed_time = time.perf_counter() - start
+            print(f"  text + pickle load {text_time * 1000:>9.2f} ms")
+            print(f"  packed open + one  {packed_time * 1000:>9.2f} ms  (speed-up: {text_time / packed_time:.1f}x)")
@@ -0,0 +1,347 @@
+# Run the whole data preparation pipeline as a DAG, skipping every stage that is already up to date
+# Usage: python pipeline.py [--dry-run] [stage ...]   (run from the directory holding the data files)
+#
+# Each stage is fingerprinted with:
+#   - the source of its script and of every sibling module it imports (so config constants are covered),
+#   - its command-line arguments,
+#   - the contents of its input files.
+# After a stage runs, its outputs are copied into a content-addressed store under CACHE_DIR and the
+# fingerprint is recorded. On the next run a stage is skipped if its outputs on disk still match the
+# recorded ones, or restored from the store if they were deleted. Stages whose dependencies are done
+# run in parallel, so the MAMS branch runs alongside the Reddit chain.
+# Import necessary libraries
+import ast
+import concurrent.futures
+import fnmatch
+import glob
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+from file_hashes import file_digest
+from table_io import intermediate_path
+
+# --- Configuration ---
+CACHE_DIR = '.pipeline_cache' # Stored outputs, fingerprints and per-stage logs (delete it to start over)
+MAX_WORKERS = 2               # Stages run at the same time
+
+# A stage depends on every stage that writes one of its inputs. Inputs may be glob patterns.
+# Scraping (scrape_reddit.py) and the manual annotation step are outside the DAG: raw_data/*.csv
+# and annotator_*.csv are source inputs. Stages that share a 'lock' never run at the same time.
+STAGES = [
+    {'name': 'clean', 'script': 'clean_data.py',
+     'inputs': ['raw_data/*.csv'], 'outputs': [intermediate_path('all_comments_cleaned.csv')]},
+    {'name': 'dedup', 'script': 'dedup_near_duplicates.py', 'args': [intermediate_path('all_comments_cleaned.csv'), 'cleaned_text'],
+     'inputs': [intermediate_path('all_comments_cleaned.csv')],
+     'outputs': [intermediate_path('all_comments_cleaned_dedup.csv'), 'all_comments_cleaned_duplicates.csv']},
+    {'name': 'split_and_extract', 'script': 'split_and_extract.py', 'args': [intermediate_path('all_comments_cleaned_dedup.csv')],
+     'inputs': [intermediate_path('all_comments_cleaned_dedup.csv')], 'outputs': ['annotation_tasks.csv']},
+    {'name': 'rank_aspects', 'script': 'rank_aspects.py', 'args': ['annotation_tasks.csv'],
+     'inputs': ['annotation_tasks.csv'], 'outputs': ['annotation_tasks_ranked.csv', 'aspect_frequencies.json']},
+    {'name': 'adjudicate', 'script': 'adjudicate.py',
+     'inputs': ['annotator_*.csv'], 'outputs': ['agreements.csv', 'disagreements_to_fix.csv']},
+    {'name': 'convert_to_raw', 'script': 'convert_to_raw.py',
+     'inputs': ['agreements.csv', 'disagreements_to_fix.csv'], 'outputs': ['reddit_train.raw', 'reddit_test.raw']},
+    {'name': 'reddit_graphs', 'script': 'build_dependency_graphs.py', 'args': ['reddit_train.raw', 'reddit_test.raw'],
+     'inputs': ['reddit_train.raw', 'reddit_test.raw'],
+     'outputs': ['reddit_train.raw.graph', 'reddit_train.raw.tree', 'reddit_test.raw.graph', 'reddit_test.raw.tree'],
+     'lock': 'dependency_cache'},
+    {'name': 'convert_mams', 'script': 'convert_mams_to_raw.py', 'args': ['MAMS_train.xml', 'MAMS_test.xml'],
+     'inputs': ['MAMS_train.xml', 'MAMS_test.xml'], 'outputs': ['MAMS_train.raw', 'MAMS_test.raw']},
+    {'name': 'mams_graphs', 'script': 'build_dependency_graphs.py', 'args': ['MAMS_train.raw', 'MAMS_test.raw'],
+     'inputs': ['MAMS_train.raw', 'MAMS_test.raw'],
+     'outputs': ['MAMS_train.raw.graph', 'MAMS_train.raw.tree', 'MAMS_test.raw.graph', 'MAMS_test.raw.tree'],
+     'lock': 'dependency_cache'},
+]
+# ---------------------
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def sibling_imports(script):
+    """
+    Returns the script and every data_preparation module it imports, directly or indirectly.
+    """
+    found = []
+    pending = [script]
+    while pending:
+        name = pending.pop()
+        if name in found:
+            continue
+        found.append(name)
+        with open(os.path.join(SCRIPT_DIR, name), 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                modules = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module:
+                modules = [node.module]
+            else:
+                continue
+            for module in modules:
+                if os.path.exists(os.path.join(SCRIPT_DIR, module + '.py')):
+                    pending.append(module + '.py')
+    return sorted(found)
+
+
+def expand(patterns):
+    """
+    Expands input patterns to sorted file lists. Returns (files, patterns that matched nothing).
+    """
+    files, missing = [], []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern))
+        if not matches:
+            missing.append(pattern)
+        files.extend(matches)
+    return files, missing
+
+
+def stage_key(stage, input_files, memo):
+    """
+    Fingerprint of everything that determines a stage's outputs.
+    """
+    h = hashlib.sha256()
+    h.update(json.dumps([stage['script'], stage.get('args', [])]).encode('utf-8'))
+    for module in sibling_imports(stage['script']):
+        h.update(module.encode('utf-8'))
+        h.update(file_digest(os.path.join(SCRIPT_DIR, module), memo).encode('utf-8'))
+    for path in input_files:
+        h.update(path.encode('utf-8'))
+        h.update(file_digest(path, memo).encode('utf-8'))
+    return h.hexdigest()
+
+
+def dependencies(stages):
+    """
+    Maps each stage name to the names of the stages that write one of its inputs.
+    """
+    deps = {}
+    for stage in stages:
+        deps[stage['name']] = set()
+        for other in stages:
+            if other is stage:
+                continue
+            if any(fnmatch.fnmatch(output, pattern) for output in other['outputs'] for pattern in stage['inputs']):
+                deps[stage['name']].add(other['name'])
+    return deps
+
+
+def select(stages, deps, targets):
+    """
+    The requested stages plus everything upstream of them (all stages if none are requested).
+    """
+    if not targets:
+        return stages
+    wanted = set()
+    pending = list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in wanted:
+            wanted.add(name)
+            pending.extend(deps[name])
+    return [stage for stage in stages if stage['name'] in wanted]
+
+
+class ArtifactCache(object):
+    """
+    Content-addressed store of stage outputs plus the manifest of fingerprints.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.objects = os.path.join(path, 'objects')
+        self.logs = os.path.join(path, 'logs')
+        for directory in [self.objects, self.logs]:
+            if not os.path.exists(directory):
+                os.makedirs(directory)
+        self.manifest = self._load('manifest.json')      # stage key -> {output path: digest}
+        self.memo = self._load('file_hashes.json')       # path -> [mtime_ns, size, digest]
+
+    def _load(self, name):
+        filename = os.path.join(self.path, name)
+        if not os.path.exists(filename):
+            return {}
+        with open(filename, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save(self, name, data):
+        # Write to a temporary file first so an interrupted run never leaves a broken manifest
+        filename = os.path.join(self.path, name)
+        with open(filename + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(filename + '.tmp', filename)
+
+    def save(self):
+        self._save('manifest.json', self.manifest)
+        self._save('file_hashes.json', self.memo)
+
+    def _object(self, digest):
+        return os.path.join(self.objects, digest[:2], digest)
+
+    def status(self, key, outputs):
+        """
+        'fresh' if the outputs on disk are the cached ones, 'restorable' if the missing ones
+        can be copied back from the store, otherwise 'stale'.
+        """
+        recorded = self.manifest.get(key)
+        if recorded is None or sorted(recorded) != sorted(outputs):
+            return 'stale'
+        restorable = False
+        for path, digest in recorded.items():
+            if os.path.exists(path):
+                if file_digest(path, self.memo) != digest:
+                    return 'stale' # Changed since it was cached (e.g. edited by hand): rerun the stage
+            elif os.path.exists(self._object(digest)):
+                restorable = True
+            else:
+                return 'stale'
+        return 'restorable' if restorable else 'fresh'
+
+    def restore(self, key):
+        for path, digest in self.manifest[key].items():
+            if not os.path.exists(path):
+                directory = os.path.dirname(path)
+                if directory and not os.path.exists(directory):
+                    os.makedirs(directory)
+                shutil.copyfile(self._object(digest), path)
+
+    def store(self, key, outputs):
+        recorded = {}
+        for path in outputs:
+            digest = file_digest(path, self.memo)
+            target = self._object(digest)
+            if not os.path.exists(target):
+                if not os.path.exists(os.path.dirname(target)):
+                    os.makedirs(os.path.dirname(target))
+                shutil.copyfile(path, target + '.tmp')
+                os.replace(target + '.tmp', target)
+            recorded[path] = digest
+        self.manifest[key] = recorded
+
+
+def run_stage(stage, log_file):
+    """
+    Runs one stage script in a subprocess and returns (return code, output).
+    """
+    command = [sys.executable, os.path.join(SCRIPT_DIR, stage['script'])] + stage.get('args', [])
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+    with open(log_file, 'w', encoding='utf-8') as f:
+        f.write(result.stdout)
+    return result.returncode, result.stdout
+
+
+def run_pipeline(stages, cache, dry_run=False):
+    """
+    Runs the stages in dependency order, up to MAX_WORKERS at a time. Returns True if nothing failed.
+    """
+    deps = dependencies(stages)
+    names = [stage['name'] for stage in stages]
+    deps = {name: deps[name] & set(names) for name in names}
+    by_name = {stage['name']: stage for stage in stages}
+    state = {} # name -> 'done' / 'ran' / 'failed' / 'blocked'
+    running = {} # future -> (name, key)
+    locks = set()
+    ok = True
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    try:
+        while len(state) < len(stages):
+            progressed = False
+            for name in names:
+                if name in state or any(name == n for n, _ in running.values()):
+                    continue
+                if any(state.get(dep) in ('failed', 'blocked') for dep in deps[name]):
+                    state[name] = 'blocked'
+                    print(f"[{name}] skipped: an upstream stage did not complete.")
+                    progressed = True
+                    continue
+                if not all(state.get(dep) in ('done', 'ran') for dep in deps[name]):
+                    continue
+                stage = by_name[name]
+                if stage.get('lock') is not None and stage['lock'] in locks:
+                    continue
+
+                # Upstream stages that would run in a real run leave this stage's inputs unknown
+                if dry_run and any(state.get(dep) == 'ran' for dep in deps[name]):
+                    state[name] = 'ran'
+                    print(f"[{name}] would run (upstream changes).")
+                    progressed = True
+                    continue
+                input_files, missing = expand(stage['inputs'])
+                if missing:
+                    state[name] = 'blocked'
+                    print(f"[{name}] waiting for inputs: {', '.join(missing)}")
+                    progressed = True
+                    continue
+
+                key = stage_key(stage, input_files, cache.memo)
+                status = cache.status(key, stage['outputs'])
+                progressed = True
+                if status == 'fresh':
+                    state[name] = 'done'
+                    print(f"[{name}] up to date.")
+                elif status == 'restorable':
+                    if not dry_run:
+                        cache.restore(key)
+                    state[name] = 'done'
+                    print(f"[{name}] {'would restore' if dry_run else 'restored'} cached outputs.")
+                elif dry_run:
+                    state[name] = 'ran'
+                    print(f"[{name}] would run.")
+                else:
+                    print(f"[{name}] running {stage['script']} {' '.join(stage.get('args', []))}".rstrip())
+                    if stage.get('lock') is not None:
+                        locks.add(stage['lock'])
+                    log_file = os.path.join(cache.logs, name + '.log')
+                    running[executor.submit(run_stage, stage, log_file)] = (name, key)
+
+            if not running:
+                if not progressed and len(state) < len(stages):
+                    print("Error: The stage dependencies contain a cycle.")
+                    return False
+                continue
+
+            finished, _ = concurrent.futures.wait(list(running), return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in finished:
+                name, key = running.pop(future)
+                stage = by_name[name]
+                locks.discard(stage.get('lock'))
+                returncode, output = future.result()
+                missing = [path for path in stage['outputs'] if not os.path.exists(path)]
+                if returncode != 0 or missing:
+                    state[name] = 'failed'
+                    ok = False
+                    print(f"[{name}] FAILED (exit code {returncode}). Output:")
+                    print(output.rstrip())
+                    if missing:
+                        print(f"[{name}] missing outputs: {', '.join(missing)}")
+                    continue
+                cache.store(key, stage['outputs'])
+                cache.save()
+                state[name] = 'ran'
+                print(f"[{name}] done. Log saved to '{os.path.join(cache.logs, name + '.log')}'.")
+    finally:
+        executor.shutdown(wait=True)
+        if not dry_run:
+            cache.save()
+    return ok
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    dry_run = '--dry-run' in args
+    targets = [arg for arg in args if arg != '--dry-run']
+
+    known = [stage['name'] for stage in STAGES]
+    for target in targets:
+        if target not in known:
+            print(f"Error: Unknown stage '{target}'. Stages: {', '.join(known)}")
+            sys.exit(1)
+
+    stages = select(STAGES, dependencies(STAGES), targets)
+    cache = ArtifactCache(CACHE_DIR)
+    if not run_pipeline(stages, cache, dry_run):
+        sys.exit(1)
+    print("Pipeline complete.")
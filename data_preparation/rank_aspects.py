@@ -0,0 +1,214 @@
+# Step 3b: Rank the aspect term candidates and keep only the best few per sentence
+# Usage: python rank_aspects.py [input_file]   (defaults to annotation_tasks.csv from Step 3)
+# extract_aspects.py keeps nearly every noun chunk, so most tasks are pronouns, generic words
+# ("a lot", "the time") or one-off phrases. Each candidate is scored by:
+#   - how often its head noun is a candidate across the corpus (counts cached in FREQUENCY_FILE
+#     under the input file's content hash, and recounted only when the input changes),
+#     where the head is approximated by the last word and singularized by simple suffix rules
+#     (no spaCy parse, so the ranking stays fast on the unparsed candidates),
+#   - whether it contains a term from the domain lexicon of one of the scraped thread categories,
+# and anything headed by a pronoun or a generic noun is pruned. The TOP_K best candidates of
+# each sentence are written, in the original (shuffled) order, for the annotators.
+# Import necessary libraries
+import collections
+import json
+import math
+import os
+import sys
+import pandas as pd
+from extract_aspects import keep_aspect
+from file_hashes import file_digest
+from instrumentation import StageProfiler
+
+# --- Configuration ---
+INPUT_CSV = 'annotation_tasks.csv'            # The output from Step 3
+OUTPUT_CSV = 'annotation_tasks_ranked.csv'    # The file to hand to the annotators
+FREQUENCY_FILE = 'aspect_frequencies.json'    # Head noun counts, cached per input file content hash
+TOP_K = 2            # Candidates kept per sentence
+MIN_SCORE = 0.2      # Candidates scoring below this are pruned even if the sentence has fewer than TOP_K
+FREQUENCY_WEIGHT = 0.6
+LEXICON_WEIGHT = 0.4
+# ---------------------
+
+# Leading words that are not part of the aspect itself
+DETERMINERS = {'the', 'a', 'an', 'my', 'your', 'his', 'her', 'its', 'our', 'their', 'this', 'that', 'these',
+               'those', 'some', 'any', 'every', 'each', 'all', 'no', 'another', 'other', 'one', 'both'}
+
+# Heads that are never worth annotating as an aspect
+GENERIC_HEADS = {'that', 'which', 'them', 'what', 'this', 'these', 'those', 'who', 'whom', 'me', 'us', 'him', 'her',
+                 'it', 'itself', 'myself', 'yourself', 'themselves', 'something', 'anything', 'everything', 'nothing',
+                 'someone', 'anyone', 'everyone', 'nobody', 'somebody', 'anybody', 'everybody', 'one', 'ones', 'any',
+                 'lot', 'lots', 'thing', 'stuff', 'way', 'time', 'times', 'year', 'month', 'week', 'day', 'people',
+                 'person', 'guy', 'kind', 'sort', 'bit', 'part', 'point', 'reason', 'fact', 'question', 'answer',
+                 'option', 'choice', 'experience', 'opinion', 'idea', 'problem', 'issue', 'case', 'end', 'rest'}
+
+# One lexicon per thread category in scrape_reddit.py's threads_to_scrape (the name without _positive/_negative)
+DOMAIN_LEXICONS = {
+    'smartphones': ['phone', 'smartphone', 'battery', 'battery life', 'screen', 'display', 'camera', 'charger',
+                    'charging', 'software', 'update', 'os', 'android', 'ios', 'iphone', 'pixel', 'galaxy', 'samsung',
+                    'apple', 'google', 'oneplus', 'motorola', 'xiaomi', 'nokia', 'sony', 'huawei', 'modem', 'signal',
+                    'storage', 'processor', 'chip', 'exynos', 'snapdragon', 'speaker', 'fingerprint sensor', 'ui'],
+    'laptops': ['laptop', 'keyboard', 'trackpad', 'touchpad', 'screen', 'display', 'battery', 'battery life', 'gpu',
+                'cpu', 'fan', 'fans', 'thermals', 'hinge', 'charger', 'warranty', 'customer service', 'support',
+                'motherboard', 'ram', 'ssd', 'lenovo', 'asus', 'dell', 'hp', 'acer', 'msi', 'razer', 'thinkpad',
+                'macbook', 'rog', 'legion', 'build quality', 'drivers', 'bios', 'windows'],
+    'fashion': ['shirt', 't-shirt', 'tee', 'jeans', 'pants', 'jacket', 'shoes', 'sneakers', 'boots', 'fabric',
+                'cotton', 'quality', 'fit', 'sizing', 'size', 'price', 'brand', 'store', 'clothes', 'basics',
+                'uniqlo', 'zara', 'h&m', 'cos', 'everlane', 'levis', 'gap', 'nike', 'stitching', 'material'],
+    'restaurants_sydney': ['restaurant', 'food', 'menu', 'dish', 'dishes', 'service', 'staff', 'waiter', 'chef',
+                           'price', 'prices', 'portion', 'portions', 'wine', 'coffee', 'dessert', 'pasta', 'pizza',
+                           'steak', 'ramen', 'sushi', 'yum cha', 'dumplings', 'atmosphere', 'ambience', 'booking',
+                           'wait', 'bill', 'breakfast', 'lunch', 'dinner', 'cafe', 'bar', 'degustation'],
+}
+
+
+def lemma(word):
+    """
+    Naive singular form of a noun ('batteries' -> 'battery', 'phones' -> 'phone').
+    An approximation of spaCy's lemma_ that needs no parse.
+    """
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 4 and word.endswith(('sses', 'shes', 'ches', 'xes')):
+        return word[:-2]
+    if len(word) > 3 and word.endswith('s') and not word.endswith(('ss', 'us', 'is', 'os')):
+        return word[:-1]
+    return word
+
+
+def aspect_tokens(aspect):
+    """
+    The lemmatized words of an aspect term without its leading determiners.
+    """
+    words = aspect.lower().split()
+    while words and words[0] in DETERMINERS:
+        words = words[1:]
+    return [lemma(word) for word in words]
+
+
+class LexiconTrie(object):
+    """
+    Word-level trie over the domain lexicons, so a multi-word term like 'battery life' is found
+    anywhere inside an aspect term with one walk per start position.
+    """
+    END = None
+
+    def __init__(self, lexicons):
+        self.root = {}
+        for category, terms in lexicons.items():
+            for term in terms:
+                node = self.root
+                for word in aspect_tokens(term):
+                    node = node.setdefault(word, {})
+                node.setdefault(self.END, set()).add(category)
+
+    def categories(self, tokens):
+        """
+        The lexicon categories with a term inside the given tokens.
+        """
+        found = set()
+        for start in range(len(tokens)):
+            node = self.root
+            for word in tokens[start:]:
+                node = node.get(word)
+                if node is None:
+                    break
+                found.update(node.get(self.END, ()))
+        return found
+
+
+def build_frequencies(aspects):
+    """
+    Counts how often each head noun (the last word, lemmatized) is a candidate in the corpus.
+    """
+    counts = collections.Counter()
+    for aspect in aspects:
+        tokens = aspect_tokens(aspect)
+        if tokens:
+            counts[tokens[-1]] += 1
+    return counts
+
+
+def save_frequencies(filename, saved):
+    tmp_filename = filename + '.tmp'
+    with open(tmp_filename, 'w', encoding='utf-8') as f:
+        json.dump(saved, f, indent=0)
+    os.replace(tmp_filename, filename)
+
+
+def load_frequencies(filename, aspects, input_file):
+    """
+    Returns the head noun counts saved in filename if they were built from the current content of
+    input_file, otherwise counts them again and saves them. The input's hash is remembered by
+    modification time and size, so an unchanged input is not even re-read.
+    """
+    saved = {}
+    if os.path.exists(filename):
+        with open(filename, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+    file_hashes = saved.get('file_hashes', {})
+    known = file_hashes.get(input_file)
+    digest = file_digest(input_file, file_hashes)
+    if saved.get('input_sha256') == digest:
+        if file_hashes[input_file] != known:
+            # Touched but unchanged: keep the new modification time so it is not hashed again
+            saved['file_hashes'] = file_hashes
+            save_frequencies(filename, saved)
+        return collections.Counter(saved['counts'])
+    counts = build_frequencies(aspects)
+    save_frequencies(filename, {'input_sha256': digest, 'file_hashes': {input_file: file_hashes[input_file]},
+                                'counts': dict(counts.most_common())})
+    print(f"Built head noun frequencies for {len(counts)} nouns. Saved to '{filename}'.")
+    return counts
+
+
+def score_aspect(aspect, frequencies, max_log_frequency, trie):
+    """
+    Score in [0, 1], or 0 for candidates that should never be annotated.
+    """
+    if not keep_aspect(aspect):
+        return 0.0
+    tokens = aspect_tokens(aspect)
+    if not tokens or tokens[-1] in GENERIC_HEADS or len(tokens[-1]) < 2:
+        return 0.0
+    frequency = math.log1p(frequencies.get(tokens[-1], 0)) / max_log_frequency if max_log_frequency > 0 else 0.0
+    in_lexicon = 1.0 if trie.categories(tokens) else 0.0
+    return FREQUENCY_WEIGHT * frequency + LEXICON_WEIGHT * in_lexicon
+
+
+def rank_tasks(df, frequencies, trie):
+    """
+    Adds a score to every task and returns a mask of the tasks to keep:
+    the TOP_K best per sentence scoring at least MIN_SCORE.
+    """
+    max_log_frequency = math.log1p(max(frequencies.values())) if frequencies else 0.0
+    # Scores depend only on the aspect text, so each distinct aspect is scored once
+    scores = {aspect: score_aspect(aspect, frequencies, max_log_frequency, trie) for aspect in df['aspect_term'].unique()}
+    df['score'] = df['aspect_term'].map(scores)
+    rank = df.sort_values('score', ascending=False, kind='mergesort').groupby('sentence').cumcount()
+    return (rank.reindex(df.index) < TOP_K) & (df['score'] >= MIN_SCORE)
+
+
+if __name__ == "__main__":
+    profiler = StageProfiler('rank_aspects').start()
+    input_file = sys.argv[1] if len(sys.argv) > 1 else INPUT_CSV
+    try:
+        with profiler.step('read'):
+            df = pd.read_csv(input_file, dtype=str).dropna(subset=['sentence', 'aspect_term'])
+    except FileNotFoundError:
+        print(f"Error: Input file '{input_file}' not found.") # Inform the user if the input file is missing
+        sys.exit(1)
+
+    with profiler.step('rank', rows=len(df)):
+        frequencies = load_frequencies(FREQUENCY_FILE, df['aspect_term'], input_file)
+        trie = LexiconTrie(DOMAIN_LEXICONS)
+        keep = rank_tasks(df, frequencies, trie)
+
+    # Keep the original column layout (and shuffled order) for the annotators
+    with profiler.step('write'):
+        df.loc[keep, ['sentence', 'aspect_term']].to_csv(OUTPUT_CSV, index=False)
+
+    print(f"Kept {int(keep.sum())} of {len(df)} candidate tasks "
+          f"(top {TOP_K} per sentence, score >= {MIN_SCORE}) for {df.loc[keep, 'sentence'].nunique()} of {df['sentence'].nunique()} sentences.")
+    print(f"New file created: '{OUTPUT_CSV}'")
+    profiler.finish(rows=len(df))
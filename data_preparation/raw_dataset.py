@@ -0,0 +1,75 @@
+# Helpers for reading the 3-line .raw format used by ASGCN
+# (sentence with $T$ placeholder, aspect term, polarity)
+
+
+def raw_entries(filename):
+    """
+    Streams a .raw file and yields (index, lines) per entry, where lines are the entry's 3 lines.
+    A truncated last entry is yielded with fewer lines, so validators can report it.
+    """
+    with open(filename, 'r', encoding='utf-8', newline='\n', errors='ignore') as f:
+        lines = []
+        index = 0
+        for line in f:
+            lines.append(line)
+            if len(lines) < 3:
+                continue
+            yield index, lines
+            index += 3
+            lines = []
+        if lines:
+            yield index, lines
+
+
+def parse_entry(lines):
+    """
+    Splits the 3 lines of an entry into (text_left, aspect, text_right, polarity).
+    Text is lowercased and split the same way as in ASGCN's data_utils.py.
+    """
+    # Older conversions lowercased the placeholder too, so accept $t$ as well
+    placeholder = "$T$" if "$T$" in lines[0] else "$t$"
+    text_left, _, text_right = [s.lower().strip() for s in lines[0].partition(placeholder)]
+    aspect = lines[1].lower().strip()
+    polarity = lines[2].strip()
+    return text_left, aspect, text_right, polarity
+
+
+def read_raw(filename):
+    """
+    Streams a .raw file and yields (index, text_left, aspect, text_right, polarity) per entry.
+
+    index is the line number of the entry's first line, which is the key the ASGCN
+    .graph/.tree pickles use. A truncated last entry is skipped.
+    """
+    for index, lines in raw_entries(filename):
+        if len(lines) == 3:
+            yield (index,) + parse_entry(lines)
+
+
+def full_text(text_left, aspect, text_right):
+    """
+    Rebuilds the sentence with the aspect term in place of $T$, as fed to the dependency parser.
+    """
+    return text_left + ' ' + aspect + ' ' + text_right
+
+
+def build_vocab(raw_files, word2idx=None):
+    """
+    Builds (or extends) a word index over the given .raw files in one pass.
+    Follows ASGCN's Tokenizer: '<pad>' is 0, '<unk>' is 1, then words in the order they are first seen.
+    """
+    if word2idx is None:
+        word2idx = {'<pad>': 0, '<unk>': 1}
+    for filename in raw_files:
+        for _, text_left, aspect, text_right, _ in read_raw(filename):
+            for word in full_text(text_left, aspect, text_right).split():
+                if word not in word2idx:
+                    word2idx[word] = len(word2idx)
+    return word2idx
+
+
+def text_to_sequence(text, word2idx):
+    """
+    Maps a text to word indices the way ASGCN's Tokenizer does (unknown words become 1).
+    """
+    return [word2idx.get(word, 1) for word in text.lower().split()]
@@ -0,0 +1,94 @@
+# Comment sources for the concurrent Reddit scraper
+# Every backend yields one dict per comment and calls limiter.acquire() before each API request,
+# so all threads share the same request budget whatever the backend.
+# Import necessary libraries
+import collections
+import json
+import threading
+import time
+
+
+class TokenBucket(object):
+    """
+    Thread-safe token bucket: allows `rate` requests per second on average, with bursts up to `capacity`.
+    """
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Blocks until a request may be made.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def comment_record(comment_id, created_utc, body):
+    return {'comment_id': comment_id, 'created_utc': created_utc, 'comment_text': body}
+
+
+class PrawBackend(object):
+    """
+    Live Reddit API through PRAW. Each worker thread gets its own Reddit instance,
+    because PRAW objects are not meant to be shared between threads.
+    """
+    def __init__(self, connect):
+        self._connect = connect
+        self._local = threading.local()
+
+    def _reddit(self):
+        if not hasattr(self._local, 'reddit'):
+            self._local.reddit = self._connect()
+        return self._local.reddit
+
+    def iter_comments(self, url, limiter):
+        # Imported here so the offline backend works without PRAW installed
+        from praw.models import MoreComments
+
+        submission = self._reddit().submission(url=url)
+        limiter.acquire()
+        # Walk the comment forest breadth-first like submission.comments.list(), but expand each
+        # "load more comments" stub as it is reached instead of calling replace_more up front,
+        # so comments can be saved while the rest of the thread is still loading.
+        queue = collections.deque(submission.comments)
+        while queue:
+            item = queue.popleft()
+            if isinstance(item, MoreComments):
+                limiter.acquire()
+                queue.extend(item.comments())
+                continue
+            yield comment_record(item.id, item.created_utc, item.body)
+            queue.extend(item.replies)
+
+
+class RecordedBackend(object):
+    """
+    Offline backend that replays recorded threads from a JSON file:
+
+        {"<thread url>": [{"id": "...", "created_utc": 1700000000.0, "body": "..."}, ...], ...}
+
+    Comments are served in pages of page_size, and each page costs one request, like the API would.
+    """
+    def __init__(self, filename, page_size=100):
+        with open(filename, 'r', encoding='utf-8') as f:
+            self._threads = json.load(f)
+        self.page_size = page_size
+
+    def iter_comments(self, url, limiter):
+        comments = self._threads[url]
+        for start in range(0, len(comments), self.page_size):
+            limiter.acquire()
+            for comment in comments[start:start + self.page_size]:
+                yield comment_record(comment['id'], comment.get('created_utc'), comment['body'])
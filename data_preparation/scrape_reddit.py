@@ -4,23 +4,29 @@ import praw # PRAW is the Python Reddit API Wrapper
 import pandas as pd
 import os
 import sys
+from instrumentation import StageProfiler
 
 # --- Reddit API Credentials ---
-try:
-    # Initialize PRAW with Reddit app credentials
-    # The user agent is a unique string that identifies the application
-    reddit = praw.Reddit(
-        # Actual credentials are not included for security reasons
-        client_id='client_id', # Replace with client id
-        client_secret='client_secret', # Replace with client secret
-        user_agent='user_agent'  # Replace with user agent
-    )
-    # Test credentials
-    reddit.user.me()
-except Exception as e:
-    # Handle authentication errors
-    print(f"Error: Could not authenticate with PRAW. Check your credentials. \nDetails: {e}")
-    sys.exit(1)
+def connect():
+    """
+    Initializes PRAW with the Reddit app credentials and checks that they work.
+    """
+    try:
+        # Initialize PRAW with Reddit app credentials
+        # The user agent is a unique string that identifies the application
+        reddit = praw.Reddit(
+            # Actual credentials are not included for security reasons
+            client_id='client_id', # Replace with client id
+            client_secret='client_secret', # Replace with client secret
+            user_agent='user_agent'  # Replace with user agent
+        )
+        # Test credentials
+        reddit.user.me()
+    except Exception as e:
+        # Handle authentication errors
+        print(f"Error: Could not authenticate with PRAW. Check your credentials. \nDetails: {e}")
+        sys.exit(1)
+    return reddit
 
 
 # --- 1. URLs to Scrape ---
@@ -42,48 +48,60 @@ threads_to_scrape = {
 # --- 2. Output Directory ---
 # Check and define the name of the output directory
 output_dir = "raw_data"
-if not os.path.exists(output_dir):
-    os.makedirs(output_dir)
 
-print(f"Starting to scrape {len(threads_to_scrape)} Reddit threads...")
-print("---")
 
-# --- 3. Loop Through Each URL and Scrape ---
-# For each thread, fetch comments and save them to a uniquely named CSV file
-for file_prefix, url in threads_to_scrape.items():
-    try:
-        # Fetch the submission using its URL
-        print(f"Fetching comments from: {url}")
-        submission = reddit.submission(url=url)
-
-        # Create a list to hold comment data
-        comments_list = []
-
-        # Load all comments, including nested ones
-        submission.comments.replace_more(limit=None)
-
-        # Loop through all top-level comments in the thread
-        for comment in submission.comments.list():
-            # Append comment text to the list
-            comments_list.append({'comment_text': comment.body})
-
-        # Create a DataFrame
-        df = pd.DataFrame(comments_list)
-        
-        # --- 4. Dynamically create the output filename ---
-        # The file will be saved inside the 'raw_data' folder
-        output_filename = os.path.join(output_dir, f"{file_prefix}_raw.csv")
-        
-        # Save to the unique CSV file
-        df.to_csv(output_filename, index=False)
-
-        print(f"Successfully scraped {len(df)} comments.")
-        print(f"Saved to '{output_filename}'")
-        print("---")
+if __name__ == "__main__":
+    profiler = StageProfiler('scrape_reddit').start()
+    reddit = connect()
 
-    except Exception as e:
-        # Handle any errors during scraping
-        print(f"Error scraping {url}: {e}")
-        print("---")
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    print(f"Starting to scrape {len(threads_to_scrape)} Reddit threads...")
+    print("---")
+    total = 0
+
+    # --- 3. Loop Through Each URL and Scrape ---
+    # For each thread, fetch comments and save them to a uniquely named CSV file
+    for file_prefix, url in threads_to_scrape.items():
+        try:
+            # Fetch the submission using its URL
+            print(f"Fetching comments from: {url}")
+            submission = reddit.submission(url=url)
+
+            # Create a list to hold comment data
+            comments_list = []
+
+            with profiler.step('fetch'):
+                # Load all comments, including nested ones
+                submission.comments.replace_more(limit=None)
+
+                # Loop through all top-level comments in the thread
+                for comment in submission.comments.list():
+                    # Append comment text to the list, with its ID and timestamp so re-scrapes can be deduplicated
+                    comments_list.append({'comment_id': comment.id, 'created_utc': comment.created_utc,
+                                          'comment_text': comment.body})
+
+            # Create a DataFrame
+            df = pd.DataFrame(comments_list)
+
+            # --- 4. Dynamically create the output filename ---
+            # The file will be saved inside the 'raw_data' folder
+            output_filename = os.path.join(output_dir, f"{file_prefix}_raw.csv")
+
+            # Save to the unique CSV file
+            with profiler.step('write', rows=len(df)):
+                df.to_csv(output_filename, index=False)
+            total += len(df)
+
+            print(f"Successfully scraped {len(df)} comments.")
+            print(f"Saved to '{output_filename}'")
+            print("---")
+
+        except Exception as e:
+            # Handle any errors during scraping
+            print(f"Error scraping {url}: {e}")
+            print("---")
 
-print("All scraping tasks complete.")
\ No newline at end of file
+    print("All scraping tasks complete.")
+    profiler.finish(rows=total)
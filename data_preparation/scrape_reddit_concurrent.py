@@ -0,0 +1,151 @@
+# Scrape many Reddit threads at once and save comments as they arrive
+# Usage: python scrape_reddit_concurrent.py [recorded_threads.json]
+#        (with a JSON file, threads are replayed offline instead of fetched from the API)
+# Import necessary libraries
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import pandas as pd
+from instrumentation import StageProfiler
+from reddit_backends import TokenBucket, PrawBackend, RecordedBackend
+from scrape_reddit import connect, threads_to_scrape, output_dir
+
+# --- Configuration ---
+MAX_WORKERS = 8                  # Threads fetched at the same time
+REQUESTS_PER_SECOND = 100 / 60.0 # Reddit allows 100 OAuth requests per minute
+BURST = 10                       # Requests that may be made back-to-back before throttling kicks in
+FLUSH_EVERY = 100                # Comments written between flushes of the output file
+OUTPUT_COLUMNS = ['comment_id', 'created_utc', 'comment_text']
+
+# Incremental mode appends only comments that are not in raw_data/<prefix>_raw.csv yet,
+# instead of overwriting the file. Run clean_data.py with STREAMING = True afterwards
+# and it will clean just the appended rows.
+INCREMENTAL = False
+STATE_FILE = os.path.join(output_dir, 'scrape_state.json') # Per-thread high-water marks (for files saved without IDs)
+# ---------------------
+
+def load_state():
+    if not os.path.exists(STATE_FILE):
+        return {}
+    with open(STATE_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_state(state):
+    # Write to a temporary file first so an interrupted run never leaves a broken state file
+    tmp_file = STATE_FILE + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_file, STATE_FILE)
+
+
+def existing_comments(output_filename):
+    """
+    Returns the comment IDs (and, for files scraped before IDs were stored, the texts) already saved.
+    Files without an ID column are rewritten once with empty IDs, keeping their rows in the same
+    order (clean_data.py's streaming mode sees the rewrite and cleans the file from the start again).
+    """
+    if not os.path.exists(output_filename):
+        return set(), set()
+    df = pd.read_csv(output_filename, dtype=str, keep_default_na=False)
+    if 'comment_id' not in df.columns:
+        df['comment_id'] = ''
+        df['created_utc'] = ''
+        df[OUTPUT_COLUMNS].to_csv(output_filename, index=False)
+    seen_ids = set(df['comment_id']) - {''}
+    seen_texts = set(df.loc[df['comment_id'] == '', 'comment_text'])
+    return seen_ids, seen_texts
+
+
+def scrape_thread(backend, limiter, file_prefix, url, thread_state=None):
+    """
+    Streams one thread's comments into raw_data/<prefix>_raw.csv.
+    Returns the number saved and, in incremental mode, the thread's updated state.
+
+    With thread_state (incremental mode) the file is appended to, and comments whose ID is already
+    saved are skipped, wherever they are relative to the high-water mark (a run that crashed before
+    saving the thread's state may have written newer ones already). The mark only limits the text
+    comparison against rows of files scraped before IDs were stored to comments no newer than it.
+    """
+    output_filename = os.path.join(output_dir, f"{file_prefix}_raw.csv")
+    incremental = thread_state is not None
+    seen_ids, seen_texts = existing_comments(output_filename) if incremental else (set(), set())
+    high_water = thread_state.get('high_water_utc') if incremental else None
+
+    write_header = not incremental or not os.path.exists(output_filename)
+    count = 0
+    newest = high_water
+    with open(output_filename, 'a' if incremental else 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=OUTPUT_COLUMNS, extrasaction='ignore', lineterminator='\n')
+        if write_header:
+            writer.writeheader()
+        for comment in backend.iter_comments(url, limiter):
+            created = comment['created_utc']
+            if comment['comment_id'] in seen_ids:
+                continue
+            # Files scraped before IDs were stored only have texts to compare older comments with
+            if (high_water is None or created is None or created <= high_water) and comment['comment_text'] in seen_texts:
+                continue
+            writer.writerow(comment)
+            seen_ids.add(comment['comment_id'])
+            count += 1
+            if created is not None and (newest is None or created > newest):
+                newest = created
+            if count % FLUSH_EVERY == 0:
+                f.flush()
+
+    if not incremental:
+        return count, None
+    return count, {'url': url, 'high_water_utc': newest, 'comments': len(seen_ids)}
+
+
+def scrape_all(backend, threads, incremental=False):
+    """
+    Scrapes every thread in a thread pool, sharing one rate limiter between them.
+    """
+    limiter = TokenBucket(REQUESTS_PER_SECOND, BURST)
+    state = load_state() if incremental else None
+    results = {}
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = {}
+        for prefix, url in threads.items():
+            thread_state = state.get(prefix, {}) if incremental else None
+            futures[executor.submit(scrape_thread, backend, limiter, prefix, url, thread_state)] = (prefix, url)
+        for future in as_completed(futures):
+            prefix, url = futures[future]
+            try:
+                results[prefix], thread_state = future.result()
+                label = "new comments" if incremental else "comments"
+                print(f"Successfully scraped {results[prefix]} {label} from: {url}")
+                print(f"Saved to '{os.path.join(output_dir, prefix + '_raw.csv')}'")
+                if incremental:
+                    # Save after every thread so a crash keeps the marks of the threads that finished
+                    state[prefix] = thread_state
+                    save_state(state)
+            except Exception as e:
+                # Handle any errors during scraping
+                print(f"Error scraping {url}: {e}")
+            print("---")
+    return results
+
+
+if __name__ == "__main__":
+    profiler = StageProfiler('scrape_reddit_concurrent').start()
+    if len(sys.argv) > 1:
+        backend = RecordedBackend(sys.argv[1])
+    else:
+        backend = PrawBackend(connect)
+
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    mode = "incrementally " if INCREMENTAL else ""
+    print(f"Starting to {mode}scrape {len(threads_to_scrape)} Reddit threads with {MAX_WORKERS} workers...")
+    print("---")
+    # Fetching and writing overlap across the worker threads, so the whole scrape is one step
+    with profiler.step('scrape'):
+        results = scrape_all(backend, threads_to_scrape, INCREMENTAL)
+    print(f"All scraping tasks complete. {sum(results.values())} comments saved.")
+    profiler.finish(rows=sum(results.values()))
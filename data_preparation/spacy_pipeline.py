@@ -0,0 +1,105 @@
+# Shared spaCy processing engine for the data preparation scripts
+# Streams texts through nlp.pipe in batches, optionally across several worker processes
+# Import necessary libraries
+import multiprocessing
+import sys
+import spacy
+from spacy.tokens import Doc
+
+# --- Configuration ---
+MODEL_NAME = "en_core_web_sm"
+BATCH_SIZE = 1000 # Number of texts handed to nlp.pipe (and to each worker) at a time
+N_PROCESS = 1     # Number of worker processes; 1 keeps everything in the current process
+
+# Pipeline components each step can do without.
+# Sentence boundaries come from the dependency parser, so splitting only needs the parser.
+# Noun chunks need the parser and the part-of-speech tags, but never the named entities.
+SENTENCE_DISABLE = ['tagger', 'ner']
+NOUN_CHUNK_DISABLE = ['ner']
+# Dependency graphs for ASGCN only need the arcs from the parser.
+DEPENDENCY_DISABLE = ['tagger', 'ner']
+# ---------------------
+
+# Per-process state for the worker pool (set once by _init_worker)
+_worker_nlp = None
+_worker_extract = None
+
+
+class WhitespaceTokenizer(object):
+    """
+    Splits on whitespace only, so token i is always word i of text.split().
+    This is the tokenizer the ASGCN dependency graph scripts use.
+    """
+    def __init__(self, vocab):
+        self.vocab = vocab
+
+    def __call__(self, text):
+        words = text.split()
+        # All tokens 'own' a subsequent space character in this tokenizer
+        spaces = [True] * len(words)
+        return Doc(self.vocab, words=words, spaces=spaces)
+
+
+def load_nlp(disable=(), whitespace_tokens=False):
+    """
+    Loads the spaCy English model with the given pipeline components disabled.
+    """
+    try:
+        nlp = spacy.load(MODEL_NAME, disable=list(disable))
+    except IOError:
+        print(f"Error: spaCy model '{MODEL_NAME}' not found.") # Inform the user if the model is not found
+        print(f"Please run: python -m spacy download {MODEL_NAME}") # Guide the user to download the model
+        sys.exit(1)
+    if whitespace_tokens:
+        nlp.tokenizer = WhitespaceTokenizer(nlp.vocab)
+    return nlp
+
+
+def _batched(texts, batch_size):
+    """
+    Groups an iterable of texts into lists of at most batch_size items.
+    """
+    batch = []
+    for text in texts:
+        batch.append(text)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _init_worker(disable, whitespace_tokens, extract):
+    # Each worker loads its own copy of the model once, not once per batch
+    global _worker_nlp, _worker_extract
+    _worker_nlp = load_nlp(disable, whitespace_tokens)
+    _worker_extract = extract
+
+
+def _process_batch(batch):
+    # Only the extracted (picklable) results travel back to the parent, never the Doc objects
+    return [_worker_extract(doc) for doc in _worker_nlp.pipe(batch, batch_size=len(batch))]
+
+
+def process_texts(texts, extract, disable=(), batch_size=BATCH_SIZE, n_process=N_PROCESS,
+                  whitespace_tokens=False):
+    """
+    Runs every text through spaCy and yields extract(doc) for each one, in input order.
+
+    extract must be a module-level function so it can be sent to the worker processes.
+    """
+    if n_process <= 1:
+        nlp = load_nlp(disable, whitespace_tokens)
+        for doc in nlp.pipe(texts, batch_size=batch_size):
+            yield extract(doc)
+        return
+
+    pool = multiprocessing.Pool(n_process, initializer=_init_worker, initargs=(list(disable), whitespace_tokens, extract))
+    try:
+        # imap keeps the batches in order while the workers run ahead
+        for results in pool.imap(_process_batch, _batched(texts, batch_size)):
+            for result in results:
+                yield result
+    finally:
+        pool.terminate()
+        pool.join()
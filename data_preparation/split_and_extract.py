@@ -0,0 +1,102 @@
+# Steps 2 + 3 in one pass: split comments into sentences and extract aspect term candidates
+# Each comment is parsed once; sentences and noun chunks both come from the same Doc.
+# Usage: python split_and_extract.py [input_file]   (e.g. all_comments_cleaned_dedup.csv from dedup_near_duplicates.py)
+# Import necessary libraries
+import os
+import pandas as pd
+import sys
+from spacy_pipeline import process_texts, NOUN_CHUNK_DISABLE
+from split_sentences import keep_sentence
+from extract_aspects import keep_aspect
+from instrumentation import StageProfiler
+from table_io import existing_table, intermediate_path, iter_table, write_table
+
+# --- Configuration ---
+INPUT_CSV = 'all_comments_cleaned.csv'      # The output from Step 1
+OUTPUT_CSV = 'annotation_tasks.csv'         # The final file for annotation
+TEXT_COLUMN = 'cleaned_text'
+WRITE_SENTENCES_CSV = False                 # Also write the old Step 2 output (in table_io.INTERMEDIATE_FORMAT)
+SENTENCES_CSV = 'all_comments_sentences.csv'
+BATCH_SIZE = 1000 # Comments per nlp.pipe batch
+N_PROCESS = 1     # Worker processes for spaCy (set higher for large corpora)
+# ---------------------
+
+def read_comments(input_file):
+    """
+    Streams the text column of the cleaned comments, one row group (or CSV chunk) at a time.
+    """
+    for chunk in iter_table(input_file, columns=[TEXT_COLUMN]):
+        for text in chunk[TEXT_COLUMN].astype(str):
+            yield text
+
+
+def sentences_with_aspects(doc):
+    """
+    Returns (sentence, [aspect terms]) for every sentence of a parsed comment worth annotating.
+    """
+    # Noun chunks are computed once for the whole comment and handed out to their sentence
+    chunks = list(doc.noun_chunks)
+    results = []
+    for sentence in doc.sents:
+        sent_text = sentence.text.strip() # Remove leading/trailing whitespace
+        if not keep_sentence(sent_text):
+            continue
+
+        aspects = []
+        for chunk in chunks:
+            if chunk.start >= sentence.start and chunk.end <= sentence.end:
+                aspect = chunk.text.lower().strip()
+                if keep_aspect(aspect):
+                    aspects.append(aspect)
+        results.append((sent_text, aspects))
+    return results
+
+
+if __name__ == "__main__":
+    profiler = StageProfiler('split_and_extract').start()
+    input_file = sys.argv[1] if len(sys.argv) > 1 else existing_table(INPUT_CSV)
+    if not os.path.exists(input_file):
+        print(f"Error: Input file '{input_file}' not found.") # Inform the user if the input file is missing
+        sys.exit(1)
+
+    print("Splitting comments and extracting aspect term candidates in a single pass...")
+
+    single_sentences = []
+    tasks = []
+    n_comments = 0
+
+    # Noun chunks need the tagger and parser, and the parser also gives us the sentence boundaries.
+    # The comments are read lazily while parsing, so the 'parse' time includes reading them.
+    parsed = process_texts(read_comments(input_file), sentences_with_aspects, disable=NOUN_CHUNK_DISABLE,
+                           batch_size=BATCH_SIZE, n_process=N_PROCESS)
+    for results in profiler.iterate('parse', parsed):
+        n_comments += 1
+        for sent_text, aspects in results:
+            single_sentences.append({'sentence_text': sent_text})
+            for aspect in aspects:
+                tasks.append({'sentence': sent_text, 'aspect_term': aspect})
+
+    if WRITE_SENTENCES_CSV:
+        df_sentences = pd.DataFrame(single_sentences)
+        with profiler.step('write'):
+            write_table(df_sentences, intermediate_path(SENTENCES_CSV))
+        print(f"Split {n_comments} comments into {len(df_sentences)} sentences.")
+        print(f"New file created: '{intermediate_path(SENTENCES_CSV)}'")
+
+    # Create a new DataFrame with the tasks
+    df_tasks = pd.DataFrame(tasks)
+
+    # Remove duplicate sentence/aspect pairs
+    df_tasks.drop_duplicates(inplace=True)
+
+    # Shuffle the data randomly
+    print(f"Found {len(df_tasks)} tasks in {len(single_sentences)} sentences. Shuffling them randomly...")
+    df_tasks = df_tasks.sample(frac=1).reset_index(drop=True)
+
+    # Save to a new CSV
+    with profiler.step('write'):
+        df_tasks.to_csv(OUTPUT_CSV, index=False)
+
+    print(f"\nSteps 2 + 3 Complete: Extracted and shuffled {len(df_tasks)} aspect tasks.")
+    print(f"New file created: '{OUTPUT_CSV}'")
+    profiler.finish(rows=n_comments)
@@ -0,0 +1,133 @@
+# Deterministic, group-aware train/test split and k-fold export for the adjudicated annotations
+# Every sentence is placed by a stable hash of its text, so:
+#   - the same input always gives the same split, whatever the row order,
+#   - adding or removing sentences moves few others: unstratified, none at all; stratified, a
+#     sentence only shifts one rank within its stratum, so at most one per boundary changes side,
+#   - all aspects of one sentence land on the same side (no sentence in both train and test),
+#   - the annotations are streamed in chunks, never loaded whole.
+# Import necessary libraries
+import collections
+import hashlib
+import os
+import sys
+import pandas as pd
+from instrumentation import StageProfiler
+from convert_to_raw import entry_problem, format_raw_entry, AGREEMENTS_FILE, RESOLVED_FILE, TRAIN_SPLIT_RATIO
+
+# --- Configuration ---
+OUTPUT_PREFIX = 'reddit'   # Writes reddit_train.raw / reddit_test.raw (and reddit_fold<k>_{train,test}.raw)
+STRATIFY = True            # Keep the polarity mix about the same in train, test and every fold
+N_FOLDS = 5                # Folds to export alongside the main split (0 to skip)
+CHUNK_SIZE = 100000        # Annotation rows read at a time
+HASH_SALT = ''             # Change to draw a different (but still reproducible) split
+# ---------------------
+
+def sentence_hash(sentence):
+    """
+    Stable 64-bit hash of a sentence.
+    """
+    digest = hashlib.blake2b((HASH_SALT + sentence).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def iter_annotations():
+    """
+    Streams (sentence, aspect_term, polarity) chunks from the agreed and the resolved files.
+    """
+    for chunk in pd.read_csv(AGREEMENTS_FILE, chunksize=CHUNK_SIZE, dtype=str):
+        yield chunk[['sentence', 'aspect_term', 'polarity']]
+    for chunk in pd.read_csv(RESOLVED_FILE, chunksize=CHUNK_SIZE, dtype=str):
+        if 'final_polarity' not in chunk.columns or chunk['final_polarity'].isnull().any():
+            print(f"Error: '{RESOLVED_FILE}' has missing 'final_polarity' values. Please fill them all in.")
+            sys.exit(1)
+        chunk = chunk.assign(polarity=chunk['final_polarity'])
+        yield chunk[['sentence', 'aspect_term', 'polarity']]
+
+
+def split_positions():
+    """
+    First pass (stratified mode): gives every sentence a position in [0, 1).
+    Sentences are grouped by stratum (their most common polarity), ordered by their stable hash
+    and spread evenly over the interval by rank, so any cut of the interval takes the same share
+    of every stratum, up to one sentence.
+    Only one hash and a small label counter per sentence are kept in memory.
+    """
+    labels = collections.defaultdict(collections.Counter)
+    for chunk in iter_annotations():
+        for sentence, polarity in zip(chunk['sentence'].astype(str), chunk['polarity'].astype(str)):
+            labels[sentence_hash(sentence)][polarity.strip().lower()] += 1
+
+    strata = collections.defaultdict(list)
+    for key, counter in labels.items():
+        # A sentence with several aspects goes to the stratum of its most common polarity
+        stratum = sorted(counter.items(), key=lambda item: (-item[1], item[0]))[0][0]
+        strata[stratum].append(key)
+
+    positions = {}
+    for keys in strata.values():
+        keys.sort()
+        for rank, key in enumerate(keys):
+            positions[key] = (rank + 0.5) / len(keys)
+    return positions
+
+
+def position(key, positions):
+    if positions is not None:
+        return positions[key]
+    # Unstratified: the hash itself is uniform over [0, 1)
+    return key / 2.0 ** 64
+
+
+if __name__ == "__main__":
+    profiler = StageProfiler('split_dataset').start()
+    # Check the inputs before any output file is opened (and truncated)
+    missing = [filename for filename in [AGREEMENTS_FILE, RESOLVED_FILE] if not os.path.exists(filename)]
+    if missing:
+        print(f"Error: Could not find files. Run find_disagreements.py and fix the disagreements") # Inform the user about missing files
+        print(f"Missing: {', '.join(missing)}")
+        sys.exit(1)
+
+    with profiler.step('stratify'):
+        positions = split_positions() if STRATIFY else None
+
+    outputs = {'train': open(f"{OUTPUT_PREFIX}_train.raw", 'w', encoding='utf-8'),
+               'test': open(f"{OUTPUT_PREFIX}_test.raw", 'w', encoding='utf-8')}
+    for k in range(N_FOLDS):
+        outputs[(k, 'train')] = open(f"{OUTPUT_PREFIX}_fold{k}_train.raw", 'w', encoding='utf-8')
+        outputs[(k, 'test')] = open(f"{OUTPUT_PREFIX}_fold{k}_test.raw", 'w', encoding='utf-8')
+    counts = collections.Counter()
+
+    # Second pass: stream every annotation into the main split and all folds at once
+    try:
+        for chunk in profiler.iterate('read', iter_annotations()):
+            for sentence, aspect_term, polarity in zip(chunk['sentence'], chunk['aspect_term'], chunk['polarity']):
+                problem = entry_problem(sentence, aspect_term, polarity)
+                if problem is not None:
+                    print(f"Warning: {problem}. Skipping '{aspect_term}'.") # Warn and skip rows that cannot be written
+                    counts['skipped'] += 1
+                    continue
+                entry = format_raw_entry(sentence, aspect_term, polarity)
+                p = position(sentence_hash(str(sentence)), positions)
+
+                side = 'train' if p < TRAIN_SPLIT_RATIO else 'test'
+                outputs[side].write(entry)
+                counts[side] += 1
+
+                test_fold = int(p * N_FOLDS)
+                for k in range(N_FOLDS):
+                    side = 'test' if k == test_fold else 'train'
+                    outputs[(k, side)].write(entry)
+                    counts[(k, side)] += 1
+    finally:
+        for f in outputs.values():
+            f.close()
+
+    print(f"Split into {counts['train']} train samples and {counts['test']} test samples "
+          f"({'stratified' if STRATIFY else 'unstratified'}, grouped by sentence).")
+    if counts['skipped']:
+        print(f"Skipped {counts['skipped']} annotations that could not be written (see the warnings above).")
+    print(f"Files created: '{OUTPUT_PREFIX}_train.raw', '{OUTPUT_PREFIX}_test.raw'")
+    for k in range(N_FOLDS):
+        print(f"Fold {k}: {counts[(k, 'train')]} train / {counts[(k, 'test')]} test "
+              f"-> '{OUTPUT_PREFIX}_fold{k}_train.raw', '{OUTPUT_PREFIX}_fold{k}_test.raw'")
+    profiler.finish(rows=counts['train'] + counts['test'])
@@ -1,51 +1,72 @@
 # Step 2: Split multi-sentence comments into single sentences
+# Usage: python split_sentences.py [input_file]   (e.g. all_comments_cleaned_dedup.csv from dedup_near_duplicates.py)
 # Import necessary libraries
 import pandas as pd
-import spacy
 import sys
+from spacy_pipeline import process_texts, SENTENCE_DISABLE
+from instrumentation import StageProfiler
+from table_io import existing_table, intermediate_path, read_table, write_table
 
 # --- Configuration ---
 INPUT_CSV = 'all_comments_cleaned.csv' # The output from Step 1
-OUTPUT_CSV = 'all_comments_sentences.csv' # The new file for aspect extraction
-TEXT_COLUMN = 'cleaned_text'             
+OUTPUT_CSV = 'all_comments_sentences.csv' # The new file for aspect extraction (.parquet with INTERMEDIATE_FORMAT = 'parquet' in table_io.py)
+TEXT_COLUMN = 'cleaned_text'
+BATCH_SIZE = 1000 # Comments per nlp.pipe batch
+N_PROCESS = 1     # Worker processes for spaCy (set higher for large corpora)
 # ---------------------
 
-try:
-    df = pd.read_csv(INPUT_CSV)
-except FileNotFoundError:
-    print(f"Error: Input file '{INPUT_CSV}' not found.") # Inform the user if the input file is missing
-    sys.exit(1)
+def keep_sentence(sent_text):
+    """
+    Filter: Only keep sentences with more than 2 words.
+    This automatically removes "Apple.", "Lumi.", "Frangos.", "Oh perfect.", etc.
+    """
+    return len(sent_text.split()) > 2
 
-try:
-    # Load the spaCy English model
-    nlp = spacy.load("en_core_web_sm")
-except IOError:
-    print("Error: spaCy model 'en_core_web_sm' not found.") # Inform the user if the model is not found
-    print("Please run: python -m spacy download en_core_web_sm") # Guide the user to download the model
-    sys.exit(1)
 
-print("Splitting multi-sentence comments into single sentences...")
-
-single_sentences = []
-
-# Iterate over each cleaned comment
-for comment in df[TEXT_COLUMN].astype(str):
-    doc = nlp(comment) # Process the comment with spaCy
-    
+def sentence_texts(doc):
+    """
+    Returns the sentences of a parsed comment that are worth annotating.
+    """
+    sentences = []
     # doc.sents is a generator that finds each individual sentence
     for sentence in doc.sents:
         sent_text = sentence.text.strip() # Remove leading/trailing whitespace
-        
-        # Filter: Only keep sentences with more than 2 words.
-        # This automatically removes "Apple.", "Lumi.", "Frangos.", "Oh perfect.", etc.
-        if len(sent_text.split()) > 2: 
+        if keep_sentence(sent_text):
+            sentences.append(sent_text)
+    return sentences
+
+
+if __name__ == "__main__":
+    profiler = StageProfiler('split_sentences').start()
+    input_file = sys.argv[1] if len(sys.argv) > 1 else existing_table(INPUT_CSV)
+    try:
+        # Only the text column is read (with Parquet, the other columns are never decoded)
+        with profiler.step('read'):
+            df = read_table(input_file, columns=[TEXT_COLUMN])
+    except FileNotFoundError:
+        print(f"Error: Input file '{input_file}' not found.") # Inform the user if the input file is missing
+        sys.exit(1)
+
+    print("Splitting multi-sentence comments into single sentences...")
+
+    single_sentences = []
+
+    # Process the cleaned comments in batches (the parser is all we need for sentence boundaries)
+    comments = df[TEXT_COLUMN].astype(str)
+    parsed = process_texts(comments, sentence_texts, disable=SENTENCE_DISABLE,
+                           batch_size=BATCH_SIZE, n_process=N_PROCESS)
+    for sentences in profiler.iterate('parse', parsed):
+        for sent_text in sentences:
             single_sentences.append({'sentence_text': sent_text})
 
-# Create a new DataFrame from the list of single sentences
-df_sentences = pd.DataFrame(single_sentences)
+    # Create a new DataFrame from the list of single sentences
+    df_sentences = pd.DataFrame(single_sentences)
 
-# Save the new DataFrame to a CSV file
-df_sentences.to_csv(OUTPUT_CSV, index=False)
+    # Save the new DataFrame in the intermediate format
+    output_file = intermediate_path(OUTPUT_CSV)
+    with profiler.step('write'):
+        write_table(df_sentences, output_file)
 
-print(f"\nStep 2 Complete: Split {len(df)} comments into {len(df_sentences)} sentences.")
-print(f"New file created: '{OUTPUT_CSV}'")
\ No newline at end of file
+    print(f"\nStep 2 Complete: Split {len(df)} comments into {len(df_sentences)} sentences.")
+    print(f"New file created: '{output_file}'")
+    profiler.finish(rows=len(df))
@@ -0,0 +1,107 @@
+# Reading and writing the intermediate tables passed between stages, as CSV or Parquet
+# Parquet is columnar: a stage can read just the column it needs, and large files can be
+# read one row group at a time. It needs pyarrow (pip install pyarrow), which is optional.
+# Files people open by hand (annotation_tasks.csv, the annotator files, agreements and
+# disagreements) always stay CSV.
+# Import necessary libraries
+import os
+import sys
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# --- Configuration ---
+INTERMEDIATE_FORMAT = 'csv' # 'csv' or 'parquet' for all_comments_cleaned and all_comments_sentences
+ROW_GROUP_SIZE = 100000     # Rows per Parquet row group (and per chunk when reading CSV in chunks)
+# ---------------------
+
+def _require_pyarrow():
+    if pq is None:
+        print("Error: INTERMEDIATE_FORMAT is 'parquet' but pyarrow is not installed.") # Inform the user about the missing package
+        print("Please run: pip install pyarrow (or set INTERMEDIATE_FORMAT = 'csv' in table_io.py)")
+        sys.exit(1)
+
+
+def is_parquet(filename):
+    return filename.endswith('.parquet')
+
+
+def intermediate_path(filename):
+    """
+    The name an intermediate file gets in the configured format, e.g. all_comments_cleaned.csv
+    becomes all_comments_cleaned.parquet.
+    """
+    if INTERMEDIATE_FORMAT == 'parquet':
+        return os.path.splitext(filename)[0] + '.parquet'
+    return filename
+
+
+def existing_table(filename):
+    """
+    The version of an intermediate file to read: the most recently written of the CSV and the
+    Parquet file, so a CSV written in streaming mode wins over an older Parquet file and the other
+    way round. The configured format wins a tie. Returns the configured name if neither exists,
+    for the error message.
+    """
+    preferred = intermediate_path(filename)
+    base = os.path.splitext(filename)[0]
+    candidates = [name for name in [preferred, base + '.parquet', base + '.csv'] if os.path.exists(name)]
+    if not candidates:
+        return preferred
+    # max() keeps the first of equally new files, i.e. the configured format
+    return max(candidates, key=lambda name: os.stat(name).st_mtime_ns)
+
+
+def read_table(filename, columns=None, nrows=None):
+    """
+    Reads a CSV or Parquet file into a DataFrame, with only the given columns if any are given.
+    With nrows, only the first nrows rows are read (for Parquet, only the batches holding them).
+    """
+    if is_parquet(filename):
+        _require_pyarrow()
+        if nrows is None:
+            return pq.read_table(filename, columns=columns).to_pandas()
+        parquet_file = pq.ParquetFile(filename)
+        batches = []
+        remaining = nrows
+        for batch in parquet_file.iter_batches(batch_size=max(1, min(nrows, ROW_GROUP_SIZE)), columns=columns):
+            if remaining <= 0:
+                break
+            batches.append(batch.slice(0, remaining))
+            remaining -= batches[-1].num_rows
+        schema = parquet_file.schema_arrow
+        if columns is not None:
+            schema = pa.schema([schema.field(name) for name in columns])
+        return pa.Table.from_batches(batches, schema=schema).to_pandas()
+    return pd.read_csv(filename, usecols=columns, nrows=nrows)
+
+
+def iter_table(filename, columns=None):
+    """
+    Yields a CSV or Parquet file as DataFrames of at most ROW_GROUP_SIZE rows.
+    For Parquet each DataFrame is one row group, and only the given columns are decoded.
+    """
+    if is_parquet(filename):
+        _require_pyarrow()
+        parquet_file = pq.ParquetFile(filename)
+        for i in range(parquet_file.num_row_groups):
+            yield parquet_file.read_row_group(i, columns=columns).to_pandas()
+    else:
+        for chunk in pd.read_csv(filename, usecols=columns, chunksize=ROW_GROUP_SIZE):
+            yield chunk
+
+
+def write_table(df, filename):
+    """
+    Writes a DataFrame as CSV or Parquet, depending on the file extension.
+    """
+    if is_parquet(filename):
+        _require_pyarrow()
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), filename, row_group_size=ROW_GROUP_SIZE)
+    else:
+        df.to_csv(filename, index=False)
@@ -0,0 +1,66 @@
+# Vectorized text cleaning engine
+# Produces exactly the same output as clean_data.clean_text, but works on a whole pandas Series:
+# the patterns are compiled once, the removal regexes run in fewer passes, ftfy only sees the rows
+# that can need it, and large inputs can be split across a process pool.
+# Import necessary libraries
+import multiprocessing
+import re
+import ftfy # for fixing text encoding issues
+import numpy as np
+import pandas as pd
+
+# --- Compiled patterns ---
+# ftfy.fix_text leaves plain printable ASCII untouched, except for HTML entities (&amp;)
+# and control characters such as \r. Only rows containing one of those are sent to ftfy.
+NEEDS_FTFY = re.compile(r'[^\t\n\x20-\x7e]|&')
+
+# URLs and Reddit user/subreddit mentions (u/ and r/) in one pass.
+# A mention stops where a URL starts, so 'r/abchttps://...' behaves as if URLs were removed first.
+URLS_AND_MENTIONS = re.compile(r'https?://\S+|www\.\S+|[ur]/(?:(?!https?://\S|www\.\S)\w)+')
+
+# Special tokens and junk
+SPECIAL_TOKENS = re.compile(r'\[deleted\]|\[removed\]|#NAME\?', flags=re.IGNORECASE)
+
+# Anything that is not a letter, number, whitespace or basic punctuation
+NON_TEXT = re.compile(r'[^a-z0-9\s.,\'"-]')
+
+WHITESPACE = re.compile(r'\s+')
+# ---------------------
+
+def clean_series(texts):
+    """
+    Cleans every text in a pandas Series and returns a new Series with the same index.
+    """
+    texts = texts.astype(str)
+
+    # 1. Fix encoding errors, only on the rows the cheap pre-check flags
+    needs_fix = texts.str.contains(NEEDS_FTFY)
+    if needs_fix.any():
+        texts = texts.copy()
+        texts[needs_fix] = texts[needs_fix].map(ftfy.fix_text)
+
+    # 2-4. Remove URLs, mentions and special tokens
+    texts = texts.str.replace(URLS_AND_MENTIONS, '', regex=True)
+    texts = texts.str.replace(SPECIAL_TOKENS, '', regex=True)
+
+    # 5-6. Lowercase, then drop everything but letters, numbers and basic punctuation
+    texts = texts.str.lower().str.replace(NON_TEXT, '', regex=True)
+
+    # 7. Normalize whitespace
+    return texts.str.replace(WHITESPACE, ' ', regex=True).str.strip()
+
+
+def clean_series_parallel(texts, n_process):
+    """
+    Splits the Series into one piece per process and cleans the pieces in a process pool.
+    """
+    if n_process <= 1 or len(texts) < n_process:
+        return clean_series(texts)
+    pieces = [texts.iloc[idx] for idx in np.array_split(np.arange(len(texts)), n_process)]
+    pool = multiprocessing.Pool(n_process)
+    try:
+        cleaned = pool.map(clean_series, pieces)
+    finally:
+        pool.close()
+        pool.join()
+    return pd.concat(cleaned)
@@ -0,0 +1,232 @@
+# Validate the .raw/.graph/.tree triples and report dataset statistics
+# Usage (from the repository root): python data_preparation/validate_datasets.py [file.raw ...]
+# (defaults to every .raw file under datasets/)
+#
+# Each .raw file is streamed once together with its .graph and .tree (ASGCN pickles, or the
+# .graph.npz/.tree.npz files from convert_graphs_to_npz.py), checking that:
+#   - the file holds whole 3-line entries, each sentence has exactly one $T$, the aspect is not
+#     empty and the polarity is -1, 0 or 1 (a lowercase $t$ placeholder is reported: ASGCN's
+#     partition('$T$') does not find it),
+#   - every entry has a graph and a tree under its line index, and there are no extra matrices,
+#   - each matrix is n x n for the n whitespace tokens of the sentence, and each .graph is symmetric.
+# It reports the label distribution, a sentence length histogram and the adjacency density.
+#
+# Summaries are cached in SUMMARY_INDEX with the content hash of the triple they were made from.
+# File hashes are remembered by modification time and size, so unchanged files are not even
+# re-read; a file that was only touched is re-hashed and still hits the cache.
+# Import necessary libraries
+import collections
+import glob
+import hashlib
+import json
+import os
+import sys
+import numpy as np
+from raw_dataset import raw_entries, parse_entry, full_text
+from adjacency_store import AdjacencyStore, load_adjacency
+from file_hashes import file_digest
+
+# --- Configuration ---
+RAW_GLOB = 'datasets/*/*.raw'
+SUMMARY_INDEX = 'datasets/validation_index.json' # Cached summaries (delete it to recompute everything)
+LENGTH_BINS = [10, 20, 30, 40, 60, 80] # Upper bounds of the sentence length histogram bins (the last bin is open)
+MAX_EXAMPLES = 5 # Problems listed per kind of problem; the rest are only counted
+# ---------------------
+
+POLARITIES = ['-1', '0', '1']
+INDEX_VERSION = 2 # Bump when the summary format or the checks change
+
+
+def companion(raw_file, kind):
+    """
+    The .graph/.tree file of a .raw file: the pickle if present, otherwise the compact .npz.
+    """
+    for filename in [raw_file + '.' + kind, raw_file + '.' + kind + '.npz']:
+        if os.path.exists(filename):
+            return filename
+    return None
+
+
+def matrix_stats(adjacency, key):
+    """
+    Returns (shape, non-zero entries, symmetric) without building a dense matrix for .npz files.
+    """
+    if isinstance(adjacency, AdjacencyStore):
+        n = adjacency.size(key)
+        rows, cols = adjacency.edges(key)
+        rows = rows.astype(np.int64)
+        cols = cols.astype(np.int64)
+        symmetric = np.array_equal(np.sort(rows * n + cols), np.sort(cols * n + rows))
+        return (n, n), len(rows), symmetric
+    matrix = np.asarray(adjacency[key])
+    symmetric = matrix.ndim == 2 and matrix.shape[0] == matrix.shape[1] and np.array_equal(matrix, matrix.T)
+    return matrix.shape, int(np.count_nonzero(matrix)), symmetric
+
+
+class Problems(object):
+    """
+    Counts problems by kind and keeps the first MAX_EXAMPLES of each.
+    """
+    def __init__(self):
+        self.counts = collections.Counter()
+        self.examples = collections.defaultdict(list)
+
+    def add(self, kind, message):
+        self.counts[kind] += 1
+        if len(self.examples[kind]) < MAX_EXAMPLES:
+            self.examples[kind].append(message)
+
+    def summary(self):
+        return {kind: {'count': count, 'examples': self.examples[kind]} for kind, count in sorted(self.counts.items())}
+
+
+def validate(raw_file, graph_files):
+    """
+    Streams one .raw file and checks it against its adjacency files ({kind: filename or None}).
+    Returns a JSON-serializable summary.
+    """
+    problems = Problems()
+    adjacency = {kind: load_adjacency(filename) for kind, filename in graph_files.items() if filename is not None}
+
+    labels = collections.Counter()
+    histogram = [0] * (len(LENGTH_BINS) + 1)
+    lengths = []
+    density = {kind: [] for kind in adjacency}
+    seen = set()
+    for index, lines in raw_entries(raw_file):
+        line_no = index + 1
+        if len(lines) < 3:
+            problems.add('truncated_entry', f"line {line_no}: file ends in the middle of an entry")
+            break
+        seen.add(index)
+        placeholders = lines[0].count('$T$')
+        if placeholders != 1:
+            lowercase = lines[0].count('$t$')
+            if placeholders == 0 and lowercase == 1:
+                problems.add('lowercase_placeholder', f"line {line_no}: $t$ instead of $T$ in '{lines[0].strip()[:80]}'")
+            else:
+                problems.add('placeholder', f"line {line_no}: {placeholders} $T$ in '{lines[0].strip()[:80]}'")
+        text_left, aspect, text_right, polarity = parse_entry(lines)
+        if not aspect:
+            problems.add('empty_aspect', f"line {line_no + 1}: empty aspect term")
+        if polarity not in POLARITIES:
+            problems.add('polarity', f"line {line_no + 2}: polarity '{polarity}'")
+        labels[polarity] += 1
+
+        n = len(full_text(text_left, aspect, text_right).split())
+        lengths.append(n)
+        histogram[np.searchsorted(LENGTH_BINS, n, side='left')] += 1
+
+        for kind, matrices in adjacency.items():
+            if index not in matrices:
+                problems.add(f'missing_{kind}', f"line {line_no}: no {kind} matrix for key {index}")
+                continue
+            shape, nonzero, symmetric = matrix_stats(matrices, index)
+            if tuple(shape) != (n, n):
+                problems.add(f'{kind}_shape', f"line {line_no}: {kind} matrix is {'x'.join(map(str, shape))}, sentence has {n} tokens")
+            elif n:
+                density[kind].append(nonzero / (n * n))
+            if kind == 'graph' and not symmetric:
+                problems.add('graph_not_symmetric', f"line {line_no}: graph matrix is not symmetric")
+
+    for kind, matrices in adjacency.items():
+        extra = sorted(set(matrices.keys()) - seen)
+        for key in extra:
+            problems.add(f'extra_{kind}', f"key {key}: {kind} matrix without a .raw entry")
+
+    return {
+        'examples': len(seen),
+        'labels': {polarity: labels[polarity] for polarity in sorted(labels, key=lambda p: (p not in POLARITIES, p))},
+        'length': {'min': min(lengths) if lengths else 0, 'mean': float(np.mean(lengths)) if lengths else 0.0,
+                   'max': max(lengths) if lengths else 0, 'histogram': histogram},
+        'density': {kind: float(np.mean(values)) if values else None for kind, values in density.items()},
+        'matrices': {kind: len(matrices) for kind, matrices in adjacency.items()},
+        'not_found': sorted(kind for kind, filename in graph_files.items() if filename is None),
+        'problems': problems.summary(),
+    }
+
+
+def load_index(filename):
+    if os.path.exists(filename):
+        with open(filename, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if index.get('version') == INDEX_VERSION:
+            return index
+    return {'version': INDEX_VERSION, 'file_hashes': {}, 'summaries': {}}
+
+
+def save_index(index, filename):
+    tmp_filename = filename + '.tmp'
+    with open(tmp_filename, 'w', encoding='utf-8') as f:
+        json.dump(index, f)
+    os.replace(tmp_filename, filename)
+
+
+def triple_key(raw_file, graph_files, file_hashes):
+    """
+    Content hash of a .raw file and its adjacency files, together with the validation settings.
+    """
+    h = hashlib.sha256(json.dumps(LENGTH_BINS).encode('utf-8'))
+    h.update(file_digest(raw_file, file_hashes).encode('ascii'))
+    for kind in sorted(graph_files):
+        filename = graph_files[kind]
+        h.update(f'|{kind}:'.encode('ascii'))
+        if filename is not None:
+            h.update(os.path.basename(filename).encode('utf-8') + file_digest(filename, file_hashes).encode('ascii'))
+    return h.hexdigest()
+
+
+def print_summary(raw_file, summary, cached):
+    print(f"{raw_file}: {summary['examples']} examples" + (" (cached)" if cached else ""))
+    total = max(summary['examples'], 1)
+    print("  labels:   " + ", ".join(f"{p}: {c} ({c / total:.1%})" for p, c in summary['labels'].items()))
+    length = summary['length']
+    print(f"  length:   min {length['min']}, mean {length['mean']:.1f}, max {length['max']}")
+    bounds = [0] + LENGTH_BINS
+    peak = max(length['histogram']) or 1
+    for i, count in enumerate(length['histogram']):
+        label = f"{bounds[i] + 1}-{bounds[i + 1]}" if i < len(LENGTH_BINS) else f">{bounds[-1]}"
+        print(f"    {label:>7} {count:>7} {'#' * int(round(40 * count / peak))}")
+    if summary['not_found']:
+        print(f"  no {' or '.join(summary['not_found'])} file; only the .raw file was checked")
+    for kind, value in summary['density'].items():
+        if value is not None:
+            print(f"  {kind} density: {value:.4f} ({summary['matrices'][kind]} matrices)")
+    if not summary['problems']:
+        print("  OK")
+    for kind, problem in summary['problems'].items():
+        print(f"  {kind}: {problem['count']}")
+        for example in problem['examples']:
+            print(f"    {example}")
+    print()
+
+
+if __name__ == "__main__":
+    raw_files = sys.argv[1:] or sorted(glob.glob(RAW_GLOB))
+    if not raw_files:
+        print(f"Error: No .raw files found matching '{RAW_GLOB}'.")
+        sys.exit(1)
+
+    index = load_index(SUMMARY_INDEX)
+    failed = 0
+    for raw_file in raw_files:
+        if not os.path.exists(raw_file):
+            print(f"Error: Input file '{raw_file}' not found.") # Inform the user if the input file is missing
+            failed += 1
+            continue
+        graph_files = {kind: companion(raw_file, kind) for kind in ['graph', 'tree']}
+        key = triple_key(raw_file, graph_files, index['file_hashes'])
+        entry = index['summaries'].get(os.path.abspath(raw_file))
+        cached = entry is not None and entry['key'] == key
+        summary = entry['summary'] if cached else validate(raw_file, graph_files)
+        index['summaries'][os.path.abspath(raw_file)] = {'key': key, 'summary': summary}
+        print_summary(raw_file, summary, cached)
+        if summary['problems']:
+            failed += 1
+
+    save_index(index, SUMMARY_INDEX)
+
+    if failed:
+        print(f"{failed} of {len(raw_files)} files have problems.")
+        sys.exit(1)
+    print(f"All {len(raw_files)} files are valid.")